@@ -1,23 +1,43 @@
 import click
-from fastapi import FastAPI, BackgroundTasks, UploadFile, File, Form, HTTPException, Query, Request
-from fastapi.responses import StreamingResponse
-from scraper.extract import extract_from_url, extract_from_pdf
-from scraper.chunker import chunk_document, generate_ingestion_payload, generate_raw_payload
-import json
+from fastapi import FastAPI, UploadFile, File, Form, HTTPException, Query, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+from starlette.background import BackgroundTask
+from scraper.extract import extract_from_url, extract_from_pdf, extract_first_10_pages_batch
+from scraper.chunker import chunk_document, generate_ingestion_payload, generate_ingestion_payloads, generate_raw_payload
+from prompts import get_authors_batch, AUTHOR_BATCH_SIZE
 import uuid
+import hashlib
 import os
-import requests
-from scraper.utils import build_output
+import pathlib
+import orjson
+from scraper.utils import iter_items_json
 from fastapi.middleware.cors import CORSMiddleware
 from pydantic import BaseModel
-from typing import Optional, List
+from typing import Optional, List, Literal
 from urllib.parse import urljoin, urlparse
 from bs4 import BeautifulSoup
+# Try to load selectolax for fast link extraction, fallback to BeautifulSoup
+try:
+    from selectolax.lexbor import LexborHTMLParser as HTMLParser
+except ImportError:
+    HTMLParser = None
+try:
+    from blake3 import blake3
+except ImportError:
+    blake3 = None
 import tempfile
-from scraper.discovery import discover_content_from_url
+import shutil
+from scraper.discovery import discover_content_from_url_async
 from dotenv import load_dotenv
 import asyncio
 import time
+from contextlib import asynccontextmanager
+import functools
+import concurrent.futures
+import multiprocessing
+import weakref
+import aiohttp
+import anyio
 
 # Load environment variables from .env file
 load_dotenv()
@@ -30,10 +50,50 @@ if openai_key:
 else:
     print("[DEBUG] No OpenAI API key found in environment variables")
 
+# Number of async workers draining the /ingest/url/async queue
+INGEST_WORKERS = int(os.getenv("INGEST_WORKERS", 8))
+# anyio's default of 40 threads is too small for batch loads (uploads, form parsing, sync endpoints)
+THREAD_POOL_SIZE = int(os.getenv("THREAD_POOL_SIZE", 128))
+HTTP_MAX_CONNECTIONS = 64
+# Don't hammer a single origin; tune with CRAWL_PER_HOST
+HTTP_MAX_PER_HOST = int(os.getenv("CRAWL_PER_HOST", 8))
+
+def _http_session():
+    # Keep-alive pool shared by the crawler and webhooks; same-host fetches reuse connections
+    return aiohttp.ClientSession(
+        connector=aiohttp.TCPConnector(limit=HTTP_MAX_CONNECTIONS, limit_per_host=HTTP_MAX_PER_HOST),
+        json_serialize=lambda obj: orjson.dumps(obj).decode(),
+    )
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    anyio.to_thread.current_default_thread_limiter().total_tokens = THREAD_POOL_SIZE
+    ensure_dirs()
+    app.state.ingest_queue = asyncio.Queue()
+    app.state.http = _http_session()
+    # Spawned rather than forked: the server process already runs anyio worker threads and HTTP clients
+    app.state.pdf_pool = concurrent.futures.ProcessPoolExecutor(
+        max_workers=os.cpu_count(), mp_context=multiprocessing.get_context("spawn")
+    )
+    workers = [asyncio.create_task(_ingest_worker(app.state.ingest_queue)) for _ in range(INGEST_WORKERS)]
+    yield
+    for worker in workers:
+        worker.cancel()
+    await asyncio.gather(*workers, return_exceptions=True)
+    await app.state.http.close()
+    app.state.pdf_pool.shutdown(wait=False, cancel_futures=True)
+
+class ORJSONResponse(JSONResponse):
+    """Default response class: serialize with orjson instead of the stdlib json module."""
+    def render(self, content) -> bytes:
+        return orjson.dumps(content, option=orjson.OPT_NON_STR_KEYS)
+
 app = FastAPI(
     title="Ingestion Engine",
     description="A service to ingest and process content from various sources.",
     version="0.2.0",
+    lifespan=lifespan,
+    default_response_class=ORJSONResponse,
 )
 
 app.add_middleware(
@@ -44,8 +104,46 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Cap concurrent CPU-heavy offloads so extraction cannot starve FastAPI's shared thread pool
+_CPU_LIMITER = anyio.CapacityLimiter(os.cpu_count() or 1)
+
+async def run_blocking(func, *args, **kwargs):
+    """Run a blocking extraction/chunking call in a worker thread, keeping the event loop free."""
+    return await anyio.to_thread.run_sync(functools.partial(func, *args, **kwargs), limiter=_CPU_LIMITER)
+
+OUTPUT_DIR = pathlib.Path("output")
+# Uploads are spooled here; created once instead of checked per request
+TMP_DIR = pathlib.Path(tempfile.gettempdir(), "ingest")
+
+def ensure_dirs():
+    OUTPUT_DIR.mkdir(exist_ok=True)
+    TMP_DIR.mkdir(exist_ok=True)
+
+def _document_digest(document: dict, team_id: str, user_id: str) -> str:
+    # team_id/user_id end up in every item, so they are part of the identity
+    payload = orjson.dumps(
+        {"document": document, "team_id": team_id, "user_id": user_id},
+        option=orjson.OPT_SORT_KEYS | orjson.OPT_NON_STR_KEYS,
+        default=str,
+    )
+    if blake3:
+        return blake3(payload).hexdigest()[:16]
+    return hashlib.sha1(payload).hexdigest()[:16]
+
 def process_and_save(document: dict, source_identifier: str, team_id: str, content_type: str, user_id: str = "default_user", chunked: bool = False):
     """Helper function to chunk a document and save it to a file."""
+    # Identical input maps to the same file, so re-ingesting a document is a disk lookup
+    output_path = OUTPUT_DIR / f"{_document_digest(document, team_id, user_id)}.json"
+    output_filename = str(output_path)
+    try:
+        output = orjson.loads(output_path.read_bytes())
+        return {"source": source_identifier, "chunk_count": len(output["items"]), "output_file": output_filename, "output": output, "cached": True}
+    except FileNotFoundError:
+        pass
+    except (orjson.JSONDecodeError, KeyError, TypeError):
+        # A truncated or foreign file is a cache miss; it is rewritten below
+        pass
+
     # Always use the chunking logic to ensure metadata (including author) is preserved
     processed_output = generate_ingestion_payload(document, team_id=team_id, user_id=user_id)
     items = processed_output["items"]
@@ -55,13 +153,21 @@ def process_and_save(document: dict, source_identifier: str, team_id: str, conte
         "team_id": team_id,
         "items": items
     }
-    if not os.path.exists("output"):
-        os.makedirs("output")
-    output_filename = f"output/{str(uuid.uuid4())}.json"
-    with open(output_filename, "w", encoding="utf-8") as f:
-        json.dump(output, f, indent=2, ensure_ascii=False)
+    # orjson emits UTF-8 bytes directly (no ASCII escaping), matching the previous ensure_ascii=False output.
+    # Written to a temp file and renamed, so a concurrent reader never sees a partial file
+    with tempfile.NamedTemporaryFile(dir=OUTPUT_DIR, suffix=".tmp", delete=False) as tmp:
+        tmp.write(orjson.dumps(output, option=orjson.OPT_INDENT_2))
+    os.replace(tmp.name, output_path)
     return {"source": source_identifier, "chunk_count": len(items), "output_file": output_filename, "output": output}
 
+UPLOAD_CHUNK_SIZE = 1 << 16
+
+def save_upload_to_temp(upload: UploadFile, suffix: str = ".pdf") -> str:
+    """Stream an uploaded file to a temp file in fixed-size chunks and return its path."""
+    with tempfile.NamedTemporaryFile(delete=False, suffix=suffix, dir=TMP_DIR) as tmp:
+        shutil.copyfileobj(upload.file, tmp, UPLOAD_CHUNK_SIZE)
+        return tmp.name
+
 @app.get("/")
 def read_root():
     """A welcome message."""
@@ -74,36 +180,75 @@ class IngestUrlRequest(BaseModel):
     depth: int = 0
     exclude_urls: Optional[List[str]] = None
 
-def crawl_urls(start_url, depth, visited=None, exclude_urls=None):
-    if visited is None:
-        visited = set()
-    if exclude_urls is None:
-        exclude_urls = set()
-    else:
-        exclude_urls = set(exclude_urls)
-    if depth < 0 or start_url in visited or start_url in exclude_urls:
-        return []
-    visited.add(start_url)
+CRAWL_TIMEOUT = 15
+# Cap on in-flight page fetches across all crawls in the process
+CRAWL_CONCURRENCY = int(os.getenv("CRAWL_CONCURRENCY", 32))
+# One semaphore per event loop: asyncio primitives bind to the first loop that waits on them
+_CRAWL_SEMAPHORES = weakref.WeakKeyDictionary()
+
+def _crawl_semaphore():
+    loop = asyncio.get_running_loop()
+    semaphore = _CRAWL_SEMAPHORES.get(loop)
+    if semaphore is None:
+        semaphore = _CRAWL_SEMAPHORES[loop] = asyncio.Semaphore(CRAWL_CONCURRENCY)
+    return semaphore
+
+async def _fetch(session, url):
+    """Fetch a single page, returning ``(url, html)`` or ``None`` on failure."""
+    async def _get():
+        async with session.get(url) as resp:
+            resp.raise_for_status()
+            return url, await resp.text()
     try:
-        resp = requests.get(start_url, timeout=15)
-        resp.raise_for_status()
-        html = resp.text
+        async with _crawl_semaphore():
+            return await asyncio.wait_for(_get(), CRAWL_TIMEOUT)
     except Exception as e:
-        print(f"[crawl_urls] Failed to fetch {start_url}: {e}")
-        return []
-    soup = BeautifulSoup(html, "html.parser")
+        print(f"[crawl_urls] Failed to fetch {url}: {e}")
+        return None
+
+def _iter_hrefs(html):
+    if HTMLParser is not None:
+        return (node.attributes.get("href") or "" for node in HTMLParser(html).css("a[href]"))
+    soup = BeautifulSoup(html, "lxml")
+    return (a["href"] for a in soup.find_all("a", href=True))
+
+def _extract_links(page_url, html, exclude_urls):
     found_urls = set()
-    for a in soup.find_all("a", href=True):
-        href = a["href"]
+    for href in _iter_hrefs(html):
         if href.startswith("#") or href.startswith("mailto:") or href.startswith("javascript:"):
             continue
-        abs_url = urljoin(start_url, href)
+        abs_url = urljoin(page_url, href)
         # Only crawl same domain or http(s) links
         if urlparse(abs_url).scheme in ("http", "https"):
             if abs_url not in exclude_urls:
                 found_urls.add(abs_url)
+    return found_urls
+
+def _discover_once(session, discoveries, url, max_depth, html):
+    """
+    Run site discovery at most once per host for a crawl.
+    Discovery already walks the whole site (sitemaps, feeds, links), so repeating it
+    for every page on the same host only re-fetches the same URLs. Concurrent pages
+    on one host share the same pending task. The page's HTML is handed over so
+    discovery does not download it a second time.
+    """
+    host = urlparse(url).netloc
+    task = discoveries.get(host)
+    if task is None:
+        # Discovery shares the crawl's pooled session
+        task = asyncio.ensure_future(discover_content_from_url_async(url, max_depth=max_depth, html_content=html, session=session))
+        discoveries[host] = task
+    return task
+
+async def _crawl_page(session, url, remaining_depth, visited, exclude_urls, discoveries):
+    page = await _fetch(session, url)
+    if page is None:
+        return None
+    html = page[1]
+    # Parse in a worker thread so other fetches keep progressing meanwhile
+    found_urls = await asyncio.to_thread(_extract_links, url, html, exclude_urls)
     # --- NEW: Use discovery module to find more URLs ---
-    discovery_results = discover_content_from_url(start_url, max_depth=depth)
+    discovery_results = await _discover_once(session, discoveries, url, remaining_depth, html)
     # Merge discovered URLs (content, pagination, category)
     extra_urls = set()
     extra_urls.update(discovery_results.get('content_urls', set()))
@@ -113,19 +258,55 @@ def crawl_urls(start_url, depth, visited=None, exclude_urls=None):
     extra_urls = {u for u in extra_urls if u not in visited and u not in exclude_urls}
     found_urls.update(extra_urls)
     # --- END NEW ---
-    results = [(start_url, html, found_urls)]
-    if depth > 0:
-        for url in found_urls:
-            results.extend(crawl_urls(url, depth-1, visited, exclude_urls))
+    return url, html, found_urls
+
+async def crawl_urls(start_url, depth, visited=None, exclude_urls=None, session=None):
+    """
+    Crawl breadth-first from start_url up to depth levels.
+    All URLs on the same level are fetched concurrently over one shared session;
+    pass the app's pooled session to reuse its connections across requests.
+    Returns a list of (url, html, found_urls) tuples.
+    """
+    if session is None:
+        async with _http_session() as session:
+            return await crawl_urls(start_url, depth, visited, exclude_urls, session)
+    if visited is None:
+        visited = set()
+    if exclude_urls is None:
+        exclude_urls = set()
+    else:
+        exclude_urls = set(exclude_urls)
+    results = []
+    discoveries = {}
+    frontier = {start_url} - visited - exclude_urls
+    level = 0
+    while frontier and level <= depth:
+        visited.update(frontier)
+        pages = await asyncio.gather(
+            *[_crawl_page(session, url, depth - level, visited, exclude_urls, discoveries) for url in frontier],
+            return_exceptions=True,
+        )
+        next_frontier = set()
+        for page in pages:
+            if isinstance(page, BaseException):
+                print(f"[crawl_urls] Failed to crawl page: {page}")
+                continue
+            if page is None:
+                continue
+            results.append(page)
+            next_frontier.update(page[2])
+        frontier = next_frontier - visited - exclude_urls
+        level += 1
     return results
 
 @app.post("/ingest/url")
-def ingest_url(request: IngestUrlRequest):
+async def ingest_url(request: IngestUrlRequest):
     # Crawl URLs up to the specified depth
-    url_html_pairs = crawl_urls(request.url, request.depth, exclude_urls=request.exclude_urls)
+    url_html_pairs = await crawl_urls(request.url, request.depth, exclude_urls=request.exclude_urls, session=app.state.http)
     all_items = []
     all_urls = []
     all_raw_data = []
+    documents = []
     
     # Track depth for each URL
     depth_map = {}
@@ -149,16 +330,19 @@ def ingest_url(request: IngestUrlRequest):
                     depth_map[found_url] = current_depth + 1
         
         # Use the extraction logic, but pass the HTML directly
-        document = extract_from_url(url, html_content=html)
+        document = await run_blocking(extract_from_url, url, html_content=html)
         if document:
-            # Generate processed output
-            processed_output = generate_ingestion_payload(document, team_id=request.team_id, user_id=request.user_id)
-            all_items.extend(processed_output["items"])
+            documents.append(document)
             
             # Generate raw output
-            raw_output = generate_raw_payload(document, team_id=request.team_id, user_id=request.user_id)
+            raw_output = await run_blocking(generate_raw_payload, document, team_id=request.team_id, user_id=request.user_id)
             all_raw_data.append(raw_output)
     
+    # Every page shares team_id/user_id, so chunk them as one group
+    if documents:
+        processed_output = await run_blocking(generate_ingestion_payloads, documents, team_id=request.team_id, user_id=request.user_id)
+        all_items.extend(processed_output["items"])
+    
     if all_items:
         processed_output = {"team_id": request.team_id, "items": all_items}
         raw_output = {"team_id": request.team_id, "raw_data": all_raw_data}
@@ -172,15 +356,15 @@ def ingest_url(request: IngestUrlRequest):
     return {"status": "error", "url": request.url, "message": "Failed to extract content."}
 
 @app.post("/ingest/pdf")
-def ingest_pdf(filepath: str, team_id: str, user_id: str = "", source_url: str = None):
-    document = extract_from_pdf(filepath, source_url=source_url)
+async def ingest_pdf(filepath: str, team_id: str, user_id: str = "", source_url: str = None):
+    document = await run_blocking(extract_from_pdf, filepath, source_url=source_url)
     if document:
-        result = process_and_save(document, filepath, team_id, content_type="book", user_id=user_id, chunked=True)
+        result = await run_blocking(process_and_save, document, filepath, team_id, content_type="book", user_id=user_id, chunked=True)
         return {"status": "success", **result}
     return {"status": "error", "filepath": filepath, "message": "Failed to extract content."}
 
 @app.post("/ingest/pdf-upload")
-def ingest_pdf_upload(
+async def ingest_pdf_upload(
     file: UploadFile = File(...), 
     team_id: str = Form(...), 
     user_id: str = Form(""), 
@@ -194,9 +378,7 @@ def ingest_pdf_upload(
     task_id = str(uuid.uuid4())
     
     try:
-        with tempfile.NamedTemporaryFile(delete=False, suffix=".pdf") as tmp:
-            tmp.write(file.file.read())
-            tmp_path = tmp.name
+        tmp_path = await anyio.to_thread.run_sync(save_upload_to_temp, file)
         
         extraction_msg = "📊 Extracting text from PDF... (this may take a few seconds)"
         
@@ -204,13 +386,13 @@ def ingest_pdf_upload(
         original_filename = file.filename
         effective_source_url = source_url or original_filename
         
-        document = extract_from_pdf(tmp_path, source_url=effective_source_url, author_mode=author_mode)
+        document = await run_blocking(extract_from_pdf, tmp_path, source_url=effective_source_url, author_mode=author_mode)
         
         if document:
             chunk_msg = "📝 Generating chunks and metadata..."
             
             # Use original filename instead of temporary file path
-            result = process_and_save(document, original_filename, team_id, content_type="book", user_id=user_id, chunked=True)
+            result = await run_blocking(process_and_save, document, original_filename, team_id, content_type="book", user_id=user_id, chunked=True)
             
             completion_msg = f"✅ Processing complete! {result['chunk_count']} chunks created"
             
@@ -245,30 +427,169 @@ def ingest_pdf_upload(
             "processing_log": processing_log
         }
 
-def send_webhook(url: str, data: dict):
+WEBHOOK_TIMEOUT = aiohttp.ClientTimeout(total=10)
+
+async def send_webhook(url: str, data: dict):
     """Sends a POST request to the specified webhook URL."""
     try:
-        requests.post(url, json=data, timeout=10)
-    except requests.RequestException as e:
+        async with app.state.http.post(url, json=data, timeout=WEBHOOK_TIMEOUT) as resp:
+            resp.raise_for_status()
+    except (aiohttp.ClientError, asyncio.TimeoutError) as e:
         print(f"Failed to send webhook to {url}: {e}")
 
-def process_url_in_background(url: str, webhook_url: str):
-    """Background task for URL ingestion and webhook notification."""
-    document = extract_from_url(url)
+async def process_url_in_background(url: str, webhook_url: str):
+    """Background job for URL ingestion and webhook notification."""
+    document = await run_blocking(extract_from_url, url)
     if document:
-        result = process_and_save(document, url, "", "", "")
+        result = await run_blocking(process_and_save, document, url, "", "", "")
         if webhook_url:
-            send_webhook(webhook_url, {"status": "success", **result})
+            await send_webhook(webhook_url, {"status": "success", **result})
     else:
         if webhook_url:
-            send_webhook(webhook_url, {"status": "error", "url": url, "message": "Failed to extract content."})
+            await send_webhook(webhook_url, {"status": "error", "url": url, "message": "Failed to extract content."})
+
+async def _ingest_worker(queue: asyncio.Queue):
+    """Consume queued async-ingest jobs forever; a failing job must not kill the worker."""
+    while True:
+        url, webhook_url = await queue.get()
+        try:
+            await process_url_in_background(url, webhook_url)
+        except Exception as e:
+            print(f"[ingest_worker] Failed to process {url}: {e}")
+        finally:
+            queue.task_done()
 
 @app.post("/ingest/url/async")
-def ingest_url_async(url: str, webhook_url: str, background_tasks: BackgroundTasks):
+async def ingest_url_async(url: str, webhook_url: str):
     """Ingests content from a URL asynchronously and sends a webhook upon completion."""
-    background_tasks.add_task(process_url_in_background, url, webhook_url)
+    app.state.ingest_queue.put_nowait((url, webhook_url))
     return {"status": "processing", "message": "Ingestion started. A webhook will be sent upon completion."}
 
+async def _batch_extract_url(url: str, author_mode: str):
+    """Crawl and extract a single batch URL, returning ([(document, identifier, content_type)], urls_info)."""
+    documents = []
+    urls_info = []
+    # Use the same crawl_urls logic as /ingest/url, but only depth 0 for batch
+    url_html_pairs = await crawl_urls(url, 0, session=app.state.http)
+    for url_entry, html, found_urls in url_html_pairs:
+        urls_info.append({
+            "original_url": url_entry,
+            "depth_level": 0,
+            "found_urls": list(found_urls)
+        })
+        # The LLM author fallback is deferred so misses can be batched across the request
+        document = await run_blocking(extract_from_url, url_entry, html_content=html, author_mode=author_mode, resolve_author=False)
+        if document:
+            documents.append((document, url_entry, "blog"))
+    return documents, urls_info
+
+async def _spool_batch_upload(pdf_file: UploadFile):
+    """Copy an upload to disk before streaming starts, so it does not depend on the request's file lifetime."""
+    try:
+        return await anyio.to_thread.run_sync(save_upload_to_temp, pdf_file), pdf_file.filename
+    except Exception as e:
+        print(f"[ingest_batch] Failed to process {pdf_file.filename}: {e}")
+        return None, pdf_file.filename
+
+async def _batch_extract_pdf(tmp_path: str, original_filename: str, author_mode: str):
+    """Extract a single spooled batch PDF in the process pool, returning ([(document, identifier, content_type)], urls_info)."""
+    documents = []
+    if not tmp_path:
+        return documents, []
+    try:
+        # Use original filename as source_url
+        loop = asyncio.get_running_loop()
+        # PDF parsing is CPU-bound, so batch uploads fan out across processes rather than threads
+        document = await loop.run_in_executor(
+            app.state.pdf_pool,
+            functools.partial(extract_from_pdf, tmp_path, source_url=original_filename, author_mode=author_mode, resolve_author=False),
+        )
+        if document:
+            documents.append((document, original_filename, "book"))
+    except Exception as e:
+        print(f"[ingest_batch] Failed to process {original_filename}: {e}")
+    finally:
+        try:
+            os.remove(tmp_path)
+        except OSError:
+            pass
+    return documents, []
+
+def _remove_batch_uploads(uploads):
+    # Covers uploads whose extraction never started, e.g. when the client left before the stream did
+    for tmp_path, _ in uploads:
+        if tmp_path:
+            try:
+                os.remove(tmp_path)
+            except OSError:
+                pass
+
+def _set_document_author(document, author):
+    if "author" in document:
+        document["author"] = author
+    document.setdefault("metadata", {})["author"] = author
+    for item in document.get("items", []):
+        item["author"] = author
+
+async def _resolve_batch_authors(documents, author_mode: str):
+    """Resolve regex misses with one OpenAI prompt per AUTHOR_BATCH_SIZE documents."""
+    pending = [document for document in documents if not document.get("metadata", {}).get("author")]
+    batches = [pending[i:i + AUTHOR_BATCH_SIZE] for i in range(0, len(pending), AUTHOR_BATCH_SIZE)]
+    try:
+        results = await asyncio.gather(*[
+            run_blocking(get_authors_batch, [(d["metadata"].get("title", ""), d.get("context", "")) for d in batch], author_mode)
+            for batch in batches
+        ])
+    except Exception as e:
+        # The response is already streaming, so leave these authors empty rather than abort it
+        print(f"[ingest_batch] Author resolution failed: {e}")
+        return
+    for batch, authors in zip(batches, results):
+        for document, author in zip(batch, authors):
+            if author:
+                _set_document_author(document, author)
+
+async def _batch_document_items(document, identifier: str, content_type: str, team_id: str, user_id: str):
+    if document.get("items"):
+        return document["items"]
+    # Fallback: try process_and_save logic
+    result = await run_blocking(process_and_save, document, identifier, team_id, content_type=content_type, user_id=user_id, chunked=True)
+    if result and result.get("output") and result["output"].get("items"):
+        return result["output"]["items"]
+    return []
+
+async def _batch_item_stream(urls, uploads, team_id: str, user_id: str, author_mode: str, all_urls: list):
+    """
+    Yield batch items as each document finishes. Documents whose author the regex pass
+    missed are held back and resolved together through the LLM once extraction is done.
+    """
+    tasks = [asyncio.ensure_future(_batch_extract_url(url, author_mode)) for url in urls]
+    tasks += [asyncio.ensure_future(_batch_extract_pdf(tmp_path, filename, author_mode)) for tmp_path, filename in uploads]
+    deferred = []
+    try:
+        for next_done in asyncio.as_completed(tasks):
+            try:
+                documents, urls_info = await next_done
+            except Exception as e:
+                print(f"[ingest_batch] Extraction failed: {e}")
+                continue
+            all_urls.extend(urls_info)
+            for document, identifier, content_type in documents:
+                if not document.get("metadata", {}).get("author"):
+                    deferred.append((document, identifier, content_type))
+                    continue
+                for item in await _batch_document_items(document, identifier, content_type, team_id, user_id):
+                    yield item
+
+        await _resolve_batch_authors([document for document, _, _ in deferred], author_mode)
+        for document, identifier, content_type in deferred:
+            for item in await _batch_document_items(document, identifier, content_type, team_id, user_id):
+                yield item
+    finally:
+        # Client went away mid-stream; stop the remaining extractions
+        for task in tasks:
+            task.cancel()
+
 @app.post("/ingest/batch")
 async def ingest_batch(
     request: Request,
@@ -276,75 +597,28 @@ async def ingest_batch(
     pdfs: List[UploadFile] = File([]),
     team_id: str = Form(...),
     user_id: str = Form(""),
-    author_mode: str = Form("balanced")
+    # Checked before streaming starts; an unknown mode would otherwise fail mid-response
+    author_mode: Literal["cost_saving", "balanced", "accuracy"] = Form("balanced")
 ):
-    all_items = []
-    all_urls = []  # Collect URLs info for output
-    
-    # Process URLs with crawling/discovery
-    for i, url in enumerate(urls, 1):
-        # Use the same crawl_urls logic as /ingest/url, but only depth 0 for batch
-        url_html_pairs = crawl_urls(url, 0)
-        for url_entry, html, found_urls in url_html_pairs:
-            all_urls.append({
-                "original_url": url_entry,
-                "depth_level": 0,
-                "found_urls": list(found_urls)
-            })
-            document = extract_from_url(url_entry, html_content=html)
-            if document and document.get("items"):
-                all_items.extend(document["items"])
-            elif document:
-                # Fallback: try process_and_save logic
-                result = process_and_save(document, url_entry, team_id, content_type="blog", user_id=user_id, chunked=True)
-                if result and result.get("output") and result["output"].get("items"):
-                    all_items.extend(result["output"]["items"])
-    
-    # Process PDFs
-    for i, pdf_file in enumerate(pdfs, 1):
-        try:
-            with tempfile.NamedTemporaryFile(delete=False, suffix=".pdf") as tmp:
-                tmp.write(await pdf_file.read())
-                tmp_path = tmp.name
-            
-            # Use original filename as source_url
-            original_filename = pdf_file.filename
-            
-            document = extract_from_pdf(tmp_path, source_url=original_filename, author_mode=author_mode)
-            
-            if document and document.get("items"):
-                all_items.extend(document["items"])
-            elif document:
-                # Fallback: try process_and_save logic
-                # Use original filename instead of temporary file path
-                result = process_and_save(document, original_filename, team_id, content_type="book", user_id=user_id, chunked=True)
-                if result and result.get("output") and result["output"].get("items"):
-                    all_items.extend(result["output"]["items"])
-            
-            os.remove(tmp_path)
-            
-        except Exception as e:
-            if 'tmp_path' in locals():
-                try:
-                    os.remove(tmp_path)
-                except:
-                    pass
+    uploads = await asyncio.gather(*[_spool_batch_upload(pdf_file) for pdf_file in pdfs])
+    all_urls = []  # Collect URLs info for output; emitted after the items
     
-    # Remove author_method from all_items if present
-    for item in all_items:
-        if 'author_method' in item:
-            del item['author_method']
+    async def items():
+        async for item in _batch_item_stream(urls, uploads, team_id, user_id, author_mode, all_urls):
+            # Remove author_method from items if present
+            item.pop('author_method', None)
+            yield item
     
-    return {
-        "team_id": team_id,
-        "items": all_items,
-        "urls": all_urls  # Add URLs info to output
-    }
+    return StreamingResponse(
+        iter_items_json({"team_id": team_id}, items(), lambda: {"urls": all_urls}),
+        media_type="application/json",
+        background=BackgroundTask(_remove_batch_uploads, uploads),
+    )
 
 @click.group()
 def cli():
     """A CLI for the Ingestion Engine."""
-    pass
+    ensure_dirs()
 
 @cli.command("ingest-url")
 @click.argument("url")
@@ -376,5 +650,29 @@ def ingest_pdf_command(filepath: str, team_id: str, user_id: str, source_url: st
     else:
         print("Failed to extract content.")
 
+@cli.command("batch-extract")
+@click.argument("directory", type=click.Path(exists=True, file_okay=False))
+@click.option("--workers", default=None, type=int, help="Worker processes (default: one per CPU).")
+@click.option("--output-dir", default=None, type=click.Path(file_okay=False), help="Write each PDF's first 10 pages to a .txt file under this directory.")
+def batch_extract_command(directory: str, workers: Optional[int], output_dir: Optional[str]):
+    """Extracts the first 10 pages of every PDF under DIRECTORY in parallel."""
+    paths = sorted(str(p) for p in pathlib.Path(directory).rglob("*.pdf"))
+    out_paths = None
+    if output_dir:
+        # Mirror DIRECTORY's layout so PDFs with the same name in different folders don't collide
+        out_paths = [pathlib.Path(output_dir, pathlib.Path(path).relative_to(directory)).with_suffix(".txt") for path in paths]
+        for out_path in out_paths:
+            out_path.parent.mkdir(parents=True, exist_ok=True)
+    print(f"Extracting {len(paths)} PDFs from {directory}...")
+    results = extract_first_10_pages_batch(
+        paths, workers=workers, on_progress=lambda done, total: print(f"[{done}/{total}]"), out_paths=out_paths
+    )
+    failed = [(path, e) for path, e in results if isinstance(e, Exception)]
+    for path, e in failed:
+        print(f"Failed to extract {path}: {e}")
+    if output_dir:
+        print(f"Output saved to {output_dir}")
+    print(f"Extracted {len(results) - len(failed)} of {len(results)} PDFs.")
+
 if __name__ == "__main__":
     cli() 
\ No newline at end of file
@@ -2,8 +2,16 @@
 Author extraction module using hybrid approach: rule-based + OpenAI fallback.
 """
 
+import hashlib
+import os
 import re
-import openai
+import threading
+from functools import lru_cache
+import orjson
+try:
+    import diskcache
+except ImportError:
+    diskcache = None
 
 # -- Prompt Templates --
 
@@ -34,6 +42,23 @@ If multiple authors, list them separated by commas.
 Give me only the author name(s).
 """
 
+AUTHOR_BATCH_PROMPT = """
+You are an expert assistant in finding author names from documents. You are given a numbered list of documents, each with a title or a URL and a content preview.
+Task: For each document, extract the name(s) of the author(s).
+
+If a document has multiple authors, list them all separated by commas.
+You are not allowed to make up an author name.
+If no author can be determined for a document, use "Unknown".
+
+Respond only with a JSON array of strings, one entry per document, in the same order. Do not say anything else.
+
+{documents}
+"""
+
+# Documents per batched prompt and preview characters sent for each of them
+AUTHOR_BATCH_SIZE = 20
+AUTHOR_BATCH_PREVIEW_LENGTH = 1000
+
 PROMPT_CONFIGS = {
     "cost_saving": {
         "content_length": 2000,
@@ -57,61 +82,58 @@ PROMPT_CONFIGS = {
 
 # -- Rule-Based Extraction --
 
+# "By John Doe", "Written by John Doe and Jane Smith" or "Author: John Doe" in one alternation
+_COMBINED_RE = re.compile(
+    r'(?:\bwritten\s+by|\bby)\s+(?P<by>[A-Z][a-z]+(?:\s+[A-Z][a-z]+)*)'
+    r'|author:\s*(?P<author>[A-Z][a-z]+(?:\s[A-Z][a-z]+)+)',
+    re.IGNORECASE,
+)
+# Lines that look like author names (proper case or all uppercase)
+_NAME_LINE_RE = re.compile(r'^[A-Z][a-z]+(?:\s+[A-Z][a-z]+)*$')
+_UPPER_LINE_RE = re.compile(r'^[A-Z .\-]{4,}$')
+_AND_SPLIT_RE = re.compile(r'\s+and\s+', re.IGNORECASE)
+_INVALID_CHAR_RE = re.compile(r"[^a-zA-Z\s\.\'-]")
+
+# Common words that might be mistaken for names
+STOPWORDS = frozenset([
+    'beyond cracking', 'coding interview', 'technical interview',
+    'careercup llc', 'palo alto ca', 'copyright', 'all rights reserved',
+    'introduction', 'preface', 'table of contents',
+])
+BAD_AUTHOR_TOKENS = frozenset(['by', 'author', 'written', 'co-author', 'contributors'])
+
 def extract_author_from_text(text):
     """Try to extract author(s) from raw text using simple regex patterns."""
-    authors = []
+    # Keyed by lowercase name so duplicates collapse while keeping the first spelling seen
+    unique_authors = {}
     
-    # Pattern 1: "By John Doe" or "By John Doe and Jane Smith"
-    matches = re.findall(r'(?:By|by)\s+([A-Z][a-z]+(?:\s[A-Z][a-z]+)+(?:\s+and\s+[A-Z][a-z]+(?:\s[A-Z][a-z]+)+)*)', text, re.IGNORECASE)
-    for match in matches:
-        # Split by "and" to get individual authors
-        if ' and ' in match.lower():
-            parts = re.split(r'\s+and\s+', match, flags=re.IGNORECASE)
-            authors.extend(parts)
-        else:
-            authors.append(match)
-    
-    # Pattern 2: "Author: John Doe"
-    matches = re.findall(r'Author:\s*([A-Z][a-z]+(?:\s[A-Z][a-z]+)+)', text, re.IGNORECASE)
-    authors.extend(matches)
-    
-    # Pattern 3: "Written by John Doe"
-    matches = re.findall(r'Written by\s+([A-Z][a-z]+(?:\s[A-Z][a-z]+)+)', text, re.IGNORECASE)
-    authors.extend(matches)
-    
-    # Pattern 4: Look for names after "by" in the middle of lines
-    matches = re.findall(r'\bby\s+([A-Z][a-z]+(?:\s+[A-Z][a-z]+)*)', text, re.IGNORECASE)
-    authors.extend(matches)
+    def add(author):
+        author = author.strip()
+        # Skip if empty, too short, or just common words
+        if len(author) < 3 or author.lower() in BAD_AUTHOR_TOKENS:
+            return
+        unique_authors.setdefault(author.lower(), author)
     
-    # Pattern 5: Look for multiple author lines (common in books)
-    # Lines that look like author names (proper case, 2-4 words, or all uppercase)
-    lines = text.split('\n')
-    for line in lines:
+    for line in text.splitlines():
         line = line.strip()
-        if (re.match(r'^[A-Z][a-z]+(?:\s+[A-Z][a-z]+)*$', line) or 
-            re.match(r'^[A-Z .\-]{4,}$', line)) and 2 <= len(line.split()) <= 4:
-            # Avoid common words that might be mistaken for names
-            if line.lower() not in ['beyond cracking', 'coding interview', 'technical interview', 
-                                   'careercup llc', 'palo alto ca', 'copyright', 'all rights reserved',
-                                   'introduction', 'preface', 'table of contents']:
-                authors.append(line)
-    
-    # Clean up and remove duplicates
-    unique_authors = []
-    for author in authors:
-        author = author.strip()
-        # Skip if empty or too short
-        if not author or len(author) < 3:
-            continue
-        # Skip if it's just common words
-        if author.lower() in ['by', 'author', 'written', 'co-author', 'contributors']:
+        if not line:
             continue
-        # Add if not already in list (case-insensitive)
-        if not any(author.lower() == existing.lower() for existing in unique_authors):
-            unique_authors.append(author)
+        for m in _COMBINED_RE.finditer(line):
+            if m.group('by'):
+                # Split "John Doe and Jane Smith" into individual authors
+                for part in _AND_SPLIT_RE.split(m.group('by')):
+                    add(part)
+            else:
+                add(m.group('author'))
+        # Look for multiple author lines (common in books)
+        # Lines that look like author names (proper case, 2-4 words, or all uppercase)
+        if (_NAME_LINE_RE.match(line) or _UPPER_LINE_RE.match(line)) and 2 <= len(line.split()) <= 4:
+            # Avoid common words that might be mistaken for names
+            if line.lower() not in STOPWORDS:
+                add(line)
     
     # Validate and filter authors
-    valid_authors = clean_and_validate_authors(unique_authors)
+    valid_authors = clean_and_validate_authors(unique_authors.values())
     
     if valid_authors:
         return ', '.join(valid_authors)
@@ -119,25 +141,34 @@ def extract_author_from_text(text):
 
 # -- OpenAI API Fallback --
 
-def extract_author_using_openai(title_or_url, content_preview=None, mode="balanced"):
+@lru_cache(maxsize=1)
+def _openai_client():
+    """Shared OpenAI client, so repeated author lookups reuse one HTTP connection pool."""
+    from openai import OpenAI
+    return OpenAI()
+
+# Forked workers (e.g. the batch PDF process pool) must not share the parent's sockets
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_openai_client.cache_clear)
+
+def _author_request(title_or_url, content_preview, mode):
     config = PROMPT_CONFIGS[mode]
     prompt = config["prompt_template"].format(
         title_or_url=title_or_url,
         content_preview=content_preview or ""
     )
-    
+    return {
+        "model": config["model"],
+        "messages": [
+            {"role": "user", "content": prompt}
+        ],
+        "max_tokens": config["max_tokens"],
+        "temperature": 0
+    }
+
+def extract_author_using_openai(title_or_url, content_preview=None, mode="balanced"):
     try:
-        from openai import OpenAI
-        client = OpenAI()
-        
-        response = client.chat.completions.create(
-            model=config["model"],
-            messages=[
-                {"role": "user", "content": prompt}
-            ],
-            max_tokens=config["max_tokens"],
-            temperature=0
-        )
+        response = _openai_client().chat.completions.create(**_author_request(title_or_url, content_preview, mode))
         return response.choices[0].message.content.strip()
     except Exception as e:
         print(f"OpenAI call failed: {e}")
@@ -145,25 +176,146 @@ def extract_author_using_openai(title_or_url, content_preview=None, mode="balanc
 
 # -- Unified Interface --
 
-def get_author(title_or_url, content_preview="", mode="balanced"):
+# Resolved authors keyed by (title_or_url, content digest, mode); oldest entries are evicted first
+_AUTHOR_CACHE_SIZE = 4096
+_AUTHOR_CACHE = {}
+_AUTHOR_CACHE_LOCK = threading.Lock()
+# With diskcache installed, resolved authors also persist across runs and are shared by worker processes
+AUTHOR_CACHE_DIR = os.getenv("AUTHOR_CACHE_DIR", ".author_cache")
+
+@lru_cache(maxsize=1)
+def _disk_cache():
+    if diskcache is None or not AUTHOR_CACHE_DIR:
+        return None
+    return diskcache.Cache(AUTHOR_CACHE_DIR)
+
+def _author_cache_key(title_or_url, content_preview, mode):
+    # Hash the preview so huge PDF texts are not kept alive as dict keys
+    digest = hashlib.blake2b(content_preview.encode("utf-8", "ignore"), digest_size=16).digest()
+    return (title_or_url, digest, mode)
+
+def _cache_get(key):
+    with _AUTHOR_CACHE_LOCK:
+        author = _AUTHOR_CACHE.get(key)
+    if author is None and _disk_cache() is not None:
+        author = _disk_cache().get(key)
+        if author is not None:
+            _memory_put(key, author)
+    return author
+
+def _cache_put(key, author):
+    # Don't cache failures (e.g. OpenAI errors) so they can be retried
+    if author is None:
+        return
+    _memory_put(key, author)
+    if _disk_cache() is not None:
+        _disk_cache().set(key, author)
+
+def _memory_put(key, author):
+    with _AUTHOR_CACHE_LOCK:
+        if len(_AUTHOR_CACHE) >= _AUTHOR_CACHE_SIZE:
+            _AUTHOR_CACHE.pop(next(iter(_AUTHOR_CACHE)))
+        _AUTHOR_CACHE[key] = author
+
+def get_author(title_or_url, content_preview="", mode="balanced", use_llm=True):
     """
     Extract author from content preview and title using:
     1. Regex-based quick pass
-    2. Fallback to OpenAI API if not found
+    2. Fallback to OpenAI API if not found (skipped when use_llm is False)
+    Results are memoized, so re-processing the same document is free.
     """
+    content_preview = content_preview or ""
+    key = _author_cache_key(title_or_url, content_preview, mode)
+    author = _cache_get(key)
+    if author is not None:
+        return author
+
+    author = _resolve_author(title_or_url, content_preview, mode, use_llm)
+    _cache_put(key, author)
+    return author
+
+def _resolve_author(title_or_url, content_preview, mode, use_llm=True):
     # Try rule-based first
     author = extract_author_from_text(content_preview)
     if author:
         return author
+    if not use_llm:
+        return None
 
+    # Fallback to OpenAI
+    return extract_author_using_openai(title_or_url, _truncate_preview(content_preview, mode), mode)
+
+def _truncate_preview(content_preview, mode):
     # Truncate content based on mode's content_length limit
-    config = PROMPT_CONFIGS[mode]
-    max_length = config["content_length"]
+    max_length = PROMPT_CONFIGS[mode]["content_length"]
     if len(content_preview) > max_length:
         content_preview = content_preview[:max_length] + "..."
-    
-    # Fallback to OpenAI
-    return extract_author_using_openai(title_or_url, content_preview, mode)
+    return content_preview
+
+def _parse_author_list(text, expected):
+    # Models sometimes wrap JSON in a markdown fence
+    text = text.strip()
+    if text.startswith("```"):
+        text = text.strip("`")
+        if text.startswith("json"):
+            text = text[4:]
+    try:
+        authors = orjson.loads(text)
+    except orjson.JSONDecodeError:
+        return None
+    if not isinstance(authors, list) or len(authors) != expected:
+        return None
+    return [_author_entry(a) for a in authors]
+
+def _author_entry(author):
+    # One entry of the batched reply; null, empty or non-string entries become None so the caller retries them
+    if isinstance(author, list):
+        author = ", ".join(a.strip() for a in author if isinstance(a, str) and a.strip())
+    if not isinstance(author, str):
+        return None
+    return author.strip() or None
+
+def get_authors_batch(items, mode="balanced"):
+    """
+    Resolve authors for up to AUTHOR_BATCH_SIZE (title_or_url, content_preview) pairs
+    with a single OpenAI prompt. Cached results are reused. Documents fall back to
+    per-item calls when the batched call fails, the response is not a JSON array of the
+    right length, or their entry is null or empty.
+    """
+    keys = [_author_cache_key(title, preview or "", mode) for title, preview in items]
+    authors = [_cache_get(key) for key in keys]
+    pending = [i for i, author in enumerate(authors) if author is None]
+    if not pending:
+        return authors
+
+    config = PROMPT_CONFIGS[mode]
+    documents = "\n".join(
+        f"{n}) TITLE: {items[i][0]}\nPREVIEW: {(items[i][1] or '')[:AUTHOR_BATCH_PREVIEW_LENGTH]}\n"
+        for n, i in enumerate(pending, start=1)
+    )
+    try:
+        response = _openai_client().chat.completions.create(
+            model=config["model"],
+            messages=[
+                {"role": "user", "content": AUTHOR_BATCH_PROMPT.format(documents=documents)}
+            ],
+            max_tokens=config["max_tokens"] * len(pending),
+            temperature=0
+        )
+        resolved = _parse_author_list(response.choices[0].message.content, len(pending))
+        if resolved is None:
+            print("Batched author response could not be parsed, falling back to per-item calls")
+    except Exception as e:
+        print(f"Batched OpenAI call failed: {e}, falling back to per-item calls")
+        resolved = None
+    for n, i in enumerate(pending):
+        author = resolved[n] if resolved is not None else None
+        if author is None:
+            title, preview = items[i]
+            author = _resolve_author(title, preview or "", mode)
+        authors[i] = author
+        _cache_put(keys[i], author)
+    return authors
 
 def is_valid_human_name(name: str) -> bool:
     name = name.strip()
@@ -177,7 +329,7 @@ def is_valid_human_name(name: str) -> bool:
         return False
 
     # Rule out non-alphabetical words (no digits or symbols)
-    if re.search(r"[^a-zA-Z\s\.\'-]", name):
+    if _INVALID_CHAR_RE.search(name):
         return False
 
     # Require at least 2 capitalized words (e.g., "Aline Lerner")
@@ -1,13 +1,28 @@
+import hashlib
+import os
+import threading
 import uuid
 import re
+from functools import lru_cache
+from itertools import islice
 from typing import List, Dict, Union
+from .utils import KeywordMatcher
+
+# spaCy and its model are loaded on first use so importing the chunker stays cheap
+@lru_cache(maxsize=1)
+def _get_nlp():
+    # Try to load spaCy, fallback to None.
+    # noun_chunks/ents/lemma_ need tagger, parser, attribute_ruler, lemmatizer and ner; senter is never used
+    try:
+        import spacy
+        return spacy.load("en_core_web_sm", exclude=["senter"])
+    except Exception:
+        return None
 
-# Try to load spaCy, fallback to None
 try:
-    import spacy
-    nlp = spacy.load("en_core_web_sm")
-except Exception:
-    nlp = None
+    import numpy as np
+except ImportError:
+    np = None
 
 # Fallback: TF-IDF
 try:
@@ -15,109 +30,171 @@ try:
 except ImportError:
     TfidfVectorizer = None
 
+# Per-chunk debug dumps are off unless CHUNKER_DEBUG is set
+_DEBUG = os.getenv("CHUNKER_DEBUG", "").lower() in ("1", "true", "yes")
+
+# Patterns used per line while chunking, compiled once at import
+_PDF_CODE_START_RE = re.compile(r'^(def |class |CREATE |GRANT |SELECT |INSERT |UPDATE |DELETE |DROP |ALTER |USE |SHOW |DESCRIBE )', re.IGNORECASE)
+# Navigation/prose phrases that rule a web line out as code
+_WEB_NON_CODE_PHRASES = KeywordMatcher([
+    'quickstart', 'navigation', 'admin portal', 'create a dashboard',
+    'learn more', 'search', 'ask ai', 'copy', 'to create a read-only user',
+    'postgresql', 'big query', 'snowflake', 'mysql', 'do the following',
+    'grant connect privileges', 'grant usage on the schema', 'grant select privileges',
+    'the connection string', 'go to', 'if you\'re using', 'for more information',
+    'the quill platform', 'create a cleaned schema', 'next steps', 'once you have',
+    'check out our guides', 'build your first dashboard', 'powered by', 'on this page'
+])
+# Characters that mark a web line as code
+_CODE_CHARS = frozenset(';{}<>=()\'"`[]#@$')
+# SQL keyword or a credential-bearing URL (user@host:port), in one search
+_WEB_CODE_RE = re.compile(r'\b(?:CREATE|GRANT|SELECT|INSERT|UPDATE|DELETE|DROP|ALTER|USE|SHOW|DESCRIBE)\b|://.*@.*:', re.IGNORECASE)
+_BULLET_RE = re.compile(r'^(\u0001|\u0002|\u0003|\-|\*|\u2022)\s+')
+_BULLET_MARK_RE = re.compile(r'^(\-|\u2022|\*)\s+')
+_URL_RE = re.compile(r'(https?://\S+)')
+_WWW_RE = re.compile(r'\b(www\.[^\s]+)')
+_MULTI_SPACE_RE = re.compile(r' +')
+# Soft line break inside a sentence. The joined line is consumed whole, so it is never joined again
+_SOFT_BREAK_RE = re.compile(r'([a-zA-Z0-9])[^\S\n]*\n[^\S\n]*([a-z0-9][^\n]*)')
+# Numbered headings: "Chapter 3", "Section 2", "Part 1", "Ch 4", "1. ", "2 ", "3.1"
+_PDF_HEADING_RE = re.compile(r'^(?:chapter|section|part|ch)\s*\d+|^\d+(?:\.\d+|\.?\s+)', re.IGNORECASE)
+# Splitting on this yields [prefix, heading1, body1, heading2, body2, ...]
+_MD_HEADING_SPLIT_RE = re.compile(r'(?m)^(#{1,6} .*)')
+_MD_HEADING_LINE_RE = re.compile(r'^\s*#{1,6}\s+.+')
+_MD_HEADING_MARK_RE = re.compile(r'^#{1,6}\s+')
+_FENCE_BEFORE_RE = re.compile(r'(?<!\n)```')
+_FENCE_AFTER_RE = re.compile(r'```(?!\n)')
+# Both format_markdown spacing rules insert one newline: after a heading line not followed
+# by a blank line, or at a single newline before non-space text
+_PARAGRAPH_GAP_RE = re.compile(r'(#+ .+\n(?!\n)|(?<!\n)\n(?=\S))')
+
 def is_code_line(line: str, mode: str = "web") -> bool:
-    if len(line.strip()) == 0:
+    stripped = line.strip()
+    if len(stripped) == 0:
         return False
+    # The line is not blank, so line[:n].isspace() means "starts with n+ whitespace chars" (same set as \s)
     if mode == "pdf":
         # Only match lines that look like real code/commands for PDFs
-        if re.match(r'^(def |class |CREATE |GRANT |SELECT |INSERT |UPDATE |DELETE |DROP |ALTER |USE |SHOW |DESCRIBE )', line.strip(), re.IGNORECASE):
+        if _PDF_CODE_START_RE.match(stripped):
             return True
-        if re.match(r'^\s{4,}', line):  # 4+ leading spaces
+        if line[:4].isspace():  # 4+ leading spaces
             return True
-        if re.match(r'^[\$\#].*', line.strip()):  # Shell prompt
+        if stripped.startswith(('$', '#')):  # Shell prompt
             return True
         return False
     # Web/URL logic (existing)
-    line_lower = line.lower().strip()
-    if any(skip in line_lower for skip in [
-        'quickstart', 'navigation', 'admin portal', 'create a dashboard', 
-        'learn more', 'search', 'ask ai', 'copy', 'to create a read-only user',
-        'postgresql', 'big query', 'snowflake', 'mysql', 'do the following',
-        'grant connect privileges', 'grant usage on the schema', 'grant select privileges',
-        'the connection string', 'go to', 'if you\'re using', 'for more information',
-        'the quill platform', 'create a cleaned schema', 'next steps', 'once you have',
-        'check out our guides', 'build your first dashboard', 'powered by', 'on this page'
-    ]):
+    line_lower = stripped.lower()
+    if _WEB_NON_CODE_PHRASES.search(line_lower):
         return False
-    if re.search(r'[;{}<>=()\'"`\[\]#@$]|  ', line):
+    if '  ' in line or not _CODE_CHARS.isdisjoint(line):
         return True
-    if re.match(r'^\s{2,}', line):  # leading spaces
+    if line[:2].isspace():  # leading spaces
         return True
-    if re.match(r'^(>>>|\$|--|\|)', line.strip()):
+    if stripped.startswith(('>>>', '$', '--', '|')):
         return True
-    if re.search(r'\b(CREATE|GRANT|SELECT|INSERT|UPDATE|DELETE|DROP|ALTER|USE|SHOW|DESCRIBE)\b', line, re.IGNORECASE):
-        return True
-    if re.search(r'://.*@.*:', line):
+    if _WEB_CODE_RE.search(line):
         return True
     return False
 
 def auto_wrap_code_blocks(text: str, mode: str = "web") -> str:
-    lines = text.splitlines()
     output = []
+    # is_code_line rejects blank lines, so the buffer only ever holds non-empty code lines
     buffer = []
     already_code_wrapped = False
+    append = output.append
+    push = buffer.append
 
-    for line in lines:
-        stripped = line.strip()
-        if stripped.startswith("```"):
-            if buffer:
-                cleaned = [b for b in buffer if b.strip()]
-                if cleaned:
-                    output.append("```")
-                    output.extend(cleaned)
-                    output.append("```")
-                buffer = []
-            output.append(line)
+    def flush():
+        if buffer:
+            append("```")
+            output.extend(buffer)
+            append("```")
+            buffer.clear()
+
+    for line in text.splitlines():
+        if line.lstrip().startswith("```"):
+            flush()
+            append(line)
             already_code_wrapped = not already_code_wrapped
             continue
         if already_code_wrapped:
-            output.append(line)
+            append(line)
             continue
-        if is_code_line(line, mode=mode):
-            buffer.append(line)
+        if is_code_line(line, mode):
+            push(line)
         else:
-            if buffer:
-                cleaned = [b for b in buffer if b.strip()]
-                if cleaned:
-                    output.append("```")
-                    output.extend(cleaned)
-                    output.append("```")
-                buffer = []
-            output.append(line)
-    if buffer:
-        cleaned = [b for b in buffer if b.strip()]
-        if cleaned:
-            output.append("```")
-            output.extend(cleaned)
-            output.append("```")
+            flush()
+            append(line)
+    flush()
     return '\n'.join(output)
 
+def _tags_from_spacy_doc(doc, top_n: int = 5) -> List[str]:
+    tags = {chunk.lemma_.lower() for chunk in doc.noun_chunks}
+    tags.update(ent.text.lower() for ent in doc.ents)
+    # Token lemmas are only walked when phrases and entities fall short
+    if len(tags) < top_n:
+        tags.update(t.lemma_.lower() for t in doc if t.is_alpha and not t.is_stop)
+    return list(islice(tags, top_n))
+
+# spaCy tags keyed by (content digest, top_n); repeated boilerplate chunks skip the pipeline.
+# Oldest entries are evicted first. TF-IDF tags depend on the whole document, so they are not cached.
+_SPACY_TAG_CACHE_SIZE = 4096
+_SPACY_TAG_CACHE = {}
+_SPACY_TAG_CACHE_LOCK = threading.Lock()
+
+def _spacy_tag_key(text: str, top_n: int):
+    return (hashlib.blake2b(text.encode("utf-8", "ignore"), digest_size=16).digest(), top_n)
+
 def extract_tags_spacy(text: str, top_n: int = 5) -> List[str]:
+    return extract_tags_spacy_batch([text], top_n)[0]
+
+SPACY_BATCH_SIZE = 32
+
+def extract_tags_spacy_batch(texts: List[str], top_n: int = 5) -> List[List[str]]:
+    # nlp.pipe streams the texts through the pipeline in batches instead of one call per chunk
+    nlp = _get_nlp()
     if not nlp:
-        return []
-    doc = nlp(text)
-    tags = set()
-    for chunk in doc.noun_chunks:
-        tags.add(chunk.lemma_.lower())
-    for ent in doc.ents:
-        tags.add(ent.text.lower())
-    if len(tags) < top_n:
-        tokens = [t.lemma_.lower() for t in doc if t.is_alpha and not t.is_stop]
-        tags.update(tokens)
-    return list(tags)[:top_n]
+        return [[] for _ in texts]
+    keys = [_spacy_tag_key(text, top_n) for text in texts]
+    with _SPACY_TAG_CACHE_LOCK:
+        results = [_SPACY_TAG_CACHE.get(key) for key in keys]
+    # Parse each distinct uncached text once
+    pending = {}
+    for i, (key, tags) in enumerate(zip(keys, results)):
+        if tags is None and key not in pending:
+            pending[key] = texts[i]
+    if pending:
+        parsed = {
+            key: _tags_from_spacy_doc(doc, top_n)
+            for key, doc in zip(pending, nlp.pipe(pending.values(), batch_size=SPACY_BATCH_SIZE))
+        }
+        with _SPACY_TAG_CACHE_LOCK:
+            for key, tags in parsed.items():
+                if len(_SPACY_TAG_CACHE) >= _SPACY_TAG_CACHE_SIZE:
+                    _SPACY_TAG_CACHE.pop(next(iter(_SPACY_TAG_CACHE)))
+                _SPACY_TAG_CACHE[key] = tags
+        results = [tags if tags is not None else parsed[key] for key, tags in zip(keys, results)]
+    # Hand out copies so chunks never share a mutable tag list with the cache
+    return [list(tags) for tags in results]
 
 def extract_tags_tfidf(texts: List[str], top_n: int = 5) -> List[List[str]]:
     if not TfidfVectorizer or not texts or all(not t.strip() for t in texts):
         return [[] for _ in texts]
     try:
         vectorizer = TfidfVectorizer(stop_words='english', max_features=50)
-        X = vectorizer.fit_transform(texts)
+        X = vectorizer.fit_transform(texts).tocsr()
         features = vectorizer.get_feature_names_out()
         tags_per_chunk = []
-        for row in X:
-            indices = row.toarray().flatten().argsort()[::-1][:top_n]
-            tags = [features[i] for i in indices if row[0, i] > 0]
-            tags_per_chunk.append(tags)
+        # Walk each CSR row's non-zero scores directly; argpartition picks the top-n without a full sort
+        for start, end in zip(X.indptr[:-1], X.indptr[1:]):
+            data = X.data[start:end]
+            if data.size == 0:
+                tags_per_chunk.append([])
+                continue
+            k = min(top_n, data.size)
+            top = np.argpartition(-data, k - 1)[:k]
+            top = top[np.argsort(-data[top], kind="stable")]
+            tags_per_chunk.append([features[j] for j in X.indices[start:end][top]])
         return tags_per_chunk
     except ValueError as e:
         # Handle case where vocabulary is empty (only stop words)
@@ -126,154 +203,129 @@ def extract_tags_tfidf(texts: List[str], top_n: int = 5) -> List[List[str]]:
         else:
             raise e
 
+_GARBAGE_PATTERNS = [re.compile(pat) for pat in [
+    # r'table of contents', r'copyright', r'all rights reserved', r'isbn', r'publisher',
+    # r'amazon', r'www\.', r'http[s]?://', r'\bpage \d+\b', r'\b\d{1,3}\b',
+    # r'\bcontents\b', r'\bindex\b', r'\bforeword\b',
+    # r'\babout the author\b', r'\bcontact', r'\bdisclaimer', r'\bno part of this',
+    # r'\bprinted in', r'\bpress', r'\bpublication', r'\bcover design', r'\bvisit',
+    # r'\bemail', r'\bwebsite', r'\b\d{4}\b',
+]]
+
 def is_garbage_line(text: str) -> bool:
-    garbage_patterns = [
-        # r'table of contents', r'copyright', r'all rights reserved', r'isbn', r'publisher',
-        # r'amazon', r'www\.', r'http[s]?://', r'\bpage \d+\b', r'\b\d{1,3}\b',
-        # r'\bcontents\b', r'\bindex\b', r'\bforeword\b',
-        # r'\babout the author\b', r'\bcontact', r'\bdisclaimer', r'\bno part of this',
-        # r'\bprinted in', r'\bpress', r'\bpublication', r'\bcover design', r'\bvisit',
-        # r'\bemail', r'\bwebsite', r'\b\d{4}\b',
-    ]
+    # Every pattern is currently disabled; skip lowering the line altogether
+    if not _GARBAGE_PATTERNS:
+        return False
     text_l = text.lower().strip()
-    return any(re.search(pat, text_l) for pat in garbage_patterns)
+    return any(pat.search(text_l) for pat in _GARBAGE_PATTERNS)
+
+def is_allcaps_heading(text: str) -> bool:
+    # At least 2 words, all caps, possibly with spaces between letters.
+    # Whitespace is uncased, so text.isupper() equals the check on the joined words.
+    if len(text.split(None, 1)) < 2:
+        return False
+    return text.isupper() and any(c.isalpha() for c in text)
 
 def postprocess_markdown(text: str, mode: str = 'web') -> str:
-    print("[DEBUG] Before postprocess_markdown:\n" + text[:1000] + ("..." if len(text) > 1000 else ""))
+    if _DEBUG:
+        print("[DEBUG] Before postprocess_markdown:\n" + text[:1000] + ("..." if len(text) > 1000 else ""))
     
     # First, auto-wrap any code blocks that aren't already wrapped
     text = auto_wrap_code_blocks(text, mode=mode)
     
-    # Clean up the text formatting
-    lines = text.splitlines()
-    processed = []
+    # Clean up the text formatting in one pass: rewrite, squash blank runs and collapse spaces
+    out = []
     in_code = False
+    last_blank = False
     
-    for line in lines:
+    for line in text.splitlines():
         l = line.strip()
         # Preserve existing code blocks
         if l.startswith('```'):
             if in_code:
-                processed.append('```')
+                line = '```'
                 in_code = False
             else:
                 in_code = True
-                processed.append(line)
-            continue
-        if in_code:
-            processed.append(line)
-            continue
-        # Process non-code lines
-        if re.match(r'^(\u0001|\u0002|\u0003|\-|\*|\u2022)\s+', l):
-            l = re.sub(r'^(\-|\u2022|\*)\s+', '* ', l)
-        l = re.sub(r'(https?://\S+)', r'[\1](\1)', l)
-        l = re.sub(r'\b(www\.[^\s]+)', r'[\1](http://\1)', l)
-        processed.append(l)
-    if in_code:
-        processed.append('```')
-    
-    # Clean up excessive blank lines and formatting
-    out = []
-    last_blank = False
-    for l in processed:
-        if l.strip() == '':
+        elif not in_code:
+            # Process non-code lines
+            if _BULLET_RE.match(l):
+                l = _BULLET_MARK_RE.sub('* ', l)
+            l = _URL_RE.sub(r'[\1](\1)', l)
+            l = _WWW_RE.sub(r'[\1](http://\1)', l)
+            line = l
+        if not l:
             if not last_blank:
                 out.append('')
             last_blank = True
-        else:
-            out.append(l)
-            last_blank = False
+            continue
+        last_blank = False
+        # Multiple spaces to single space
+        if '  ' in line:
+            line = _MULTI_SPACE_RE.sub(' ', line)
+        out.append(line)
+    if in_code:
+        out.append('```')
     
     result = '\n'.join(out).strip()
     
-    # Final cleanup: remove excessive whitespace and normalize formatting
-    result = re.sub(r'\n{3,}', '\n\n', result)  # Max 2 consecutive newlines
-    result = re.sub(r' +', ' ', result)  # Multiple spaces to single space
-    
-    print("[DEBUG] After postprocess_markdown:\n" + result[:1000] + ("..." if len(result) > 1000 else ""))
+    if _DEBUG:
+        print("[DEBUG] After postprocess_markdown:\n" + result[:1000] + ("..." if len(result) > 1000 else ""))
     return result
 
 def smart_join_pdf_lines(text: str) -> str:
-    lines = text.splitlines()
-    output = []
-    i = 0
-    while i < len(lines):
-        line = lines[i]
-        if i < len(lines) - 1:
-            next_line = lines[i + 1]
-            # If line ends with a word and next line starts with lowercase/digit, join with space
-            if (
-                re.search(r'[a-zA-Z0-9]$', line.strip()) and
-                re.match(r'^[a-z0-9]', next_line.strip())
-            ):
-                output.append(line.rstrip() + ' ' + next_line.lstrip())
-                i += 2
-                continue
-        output.append(line)
-        i += 1
-    return '\n'.join([l for l in output if l.strip()])
+    # If a line ends with a word and the next line starts with lowercase/digit, join with space.
+    # Normalize line breaks first so the pattern only has to deal with '\n'.
+    text = '\n'.join(text.splitlines())
+    text = _SOFT_BREAK_RE.sub(r'\1 \2', text)
+    return '\n'.join([l for l in text.split('\n') if l.strip()])
+
+def _assign_chunk_ids(chunks: List[Dict]) -> None:
+    # One urandom read for the whole document instead of one per uuid4() call
+    raw = os.urandom(16 * len(chunks))
+    for i, chunk in enumerate(chunks):
+        chunk["id"] = str(uuid.UUID(bytes=raw[16 * i:16 * i + 16], version=4))
 
 def chunk_pdf_by_headings(lines: List[Dict], metadata: Dict, min_heading_font: float = None) -> List[Dict]:
-    # Join lines smartly before further processing
-    joined_lines = []
+    # Join lines smartly before further processing, then split the line dicts into
+    # parallel text/size lists so the loops below index lists instead of doing dict lookups
+    texts = []
+    sizes = []
     for line in lines:
         # If the line is a dict with 'text', process it
         if isinstance(line, dict) and 'text' in line:
             line['text'] = smart_join_pdf_lines(line['text']) if '\n' in line['text'] else line['text']
-        joined_lines.append(line)
-    lines = joined_lines
-    font_sizes = [line["size"] for line in lines if line["size"]]
+        texts.append(line["text"])
+        sizes.append(line["size"])
+    font_sizes = [size for size in sizes if size]
     if not font_sizes:
         min_heading_font = None
     elif min_heading_font is None:
-        font_sizes_sorted = sorted(font_sizes)
-        min_heading_font = font_sizes_sorted[int(0.9 * len(font_sizes))] if font_sizes_sorted else 0
-
-    # Heading patterns: classic + all-caps multi-word
-    heading_patterns = [
-        re.compile(r"^chapter\s*\d+", re.IGNORECASE),
-        re.compile(r"^section\s*\d+", re.IGNORECASE),
-        re.compile(r"^part\s*\d+", re.IGNORECASE),
-        re.compile(r"^ch\s*\d+", re.IGNORECASE),
-        re.compile(r"^\d+\.\s+"),
-        re.compile(r"^\d+\s+"),
-        re.compile(r"^\d+\.\d+"),
-    ]
-    def is_allcaps_heading(text):
-        # At least 2 words, all caps, possibly with spaces between letters
-        words = text.split()
-        if len(words) < 2:
-            return False
-        # Remove spaces and check if all letters are uppercase or non-alpha
-        joined = ''.join(words)
-        return joined.isupper() and any(c.isalpha() for c in joined)
+        # 90th percentile font size; partition selects it in O(N) without sorting every line
+        k = int(0.9 * len(font_sizes))
+        if np is not None:
+            min_heading_font = float(np.partition(np.asarray(font_sizes, dtype=np.float64), k)[k])
+        else:
+            min_heading_font = sorted(font_sizes)[k]
 
     chunks = []
     current_chunk = []
     current_title = None
-    for i, line in enumerate(lines):
-        text = line["text"].strip()
-        size = line["size"]
+    for text in texts:
+        text = text.strip()
         if not text or is_garbage_line(text):
             continue
         # Heading detection: classic or all-caps multi-word
-        is_heading = False
-        for pat in heading_patterns:
-            if pat.match(text):
-                is_heading = True
-                break
-        if not is_heading and is_allcaps_heading(text):
-            is_heading = True
+        is_heading = bool(_PDF_HEADING_RE.match(text)) or is_allcaps_heading(text)
         if is_heading:
             # Save previous chunk
             if current_chunk and current_title:
                 chunk_text = "\n".join(current_chunk).strip()
                 if chunk_text:
                     chunks.append({
-                        "id": str(uuid.uuid4()),
                         "source": metadata.get("source_url"),
                         "content": f"## {current_title}\n\n" + postprocess_markdown(chunk_text, mode='pdf'),
-                        "metadata": metadata.copy(),
+                        "metadata": metadata,
                     })
             current_title = text
             current_chunk = []
@@ -284,30 +336,34 @@ def chunk_pdf_by_headings(lines: List[Dict], metadata: Dict, min_heading_font: f
         chunk_text = "\n".join(current_chunk).strip()
         if chunk_text:
             chunks.append({
-                "id": str(uuid.uuid4()),
                 "source": metadata.get("source_url"),
                 "content": f"## {current_title}\n\n" + postprocess_markdown(chunk_text, mode='pdf'),
-                "metadata": metadata.copy(),
+                "metadata": metadata,
             })
     # Fallback: if no real headings found, aggregate all content into one chunk
     if not chunks:
-        all_content = "\n".join([line["text"].strip() for line in lines if line["text"].strip() and not is_garbage_line(line["text"])])
+        all_content = "\n".join([text for text in map(str.strip, texts) if text and not is_garbage_line(text)])
         chunks = [{
-            "id": str(uuid.uuid4()),
             "source": metadata.get("source_url"),
             "content": postprocess_markdown(all_content, mode='pdf'),
-            "metadata": metadata.copy(),
+            "metadata": metadata,
         }]
-    # Merge small chunks (<300 chars) with previous
+    # Merge small chunks (<300 chars) with previous; collect the pieces and join once
     merged_chunks = []
+    merged_parts = []
     for chunk in chunks:
         if merged_chunks and len(chunk["content"]) < 300:
-            merged_chunks[-1]["content"] += "\n\n" + chunk["content"]
+            merged_parts[-1].append(chunk["content"])
         else:
             merged_chunks.append(chunk)
+            merged_parts.append([chunk["content"]])
+    for chunk, parts in zip(merged_chunks, merged_parts):
+        if len(parts) > 1:
+            chunk["content"] = "\n\n".join(parts)
+    _assign_chunk_ids(merged_chunks)
     return merged_chunks
 
-def chunk_document(document: Dict) -> List[Dict]:
+def _split_document(document: Dict) -> List[Dict]:
     content = document.get("content", "")
     metadata = document.get("metadata", {})
     
@@ -322,61 +378,69 @@ def chunk_document(document: Dict) -> List[Dict]:
         }
     
     if isinstance(content, list) and content and isinstance(content[0], dict):
-        chunks = chunk_pdf_by_headings(content, metadata)
+        return chunk_pdf_by_headings(content, metadata)
+    parts = _MD_HEADING_SPLIT_RE.split(content)
+    chunks = []
+    if len(parts) > 1:
+        # Text before the first heading is not part of any chunk
+        for heading, body in zip(parts[1::2], parts[2::2]):
+            chunk_content = (heading + body).strip()
+            if chunk_content:
+                chunks.append({
+                    "source": metadata.get("source_url"),
+                    "content": postprocess_markdown(chunk_content),
+                    "metadata": metadata,
+                })
     else:
-        heading_pattern = re.compile(r'(^|\n)(#{1,6} .*)')
-        matches = list(heading_pattern.finditer(content))
-        chunks = []
-        if matches:
-            for i, match in enumerate(matches):
-                start = match.start(2)
-                end = matches[i+1].start(2) if i+1 < len(matches) else len(content)
-                chunk_content = content[start:end].strip()
-                if chunk_content:
-                    chunks.append({
-                        "id": str(uuid.uuid4()),
-                        "source": metadata.get("source_url"),
-                        "content": postprocess_markdown(chunk_content),
-                        "metadata": metadata.copy(),
-                    })
-        else:
-            for chunk_content in content.split('\n\n'):
-                if chunk_content.strip():
-                    chunks.append({
-                        "id": str(uuid.uuid4()),
-                        "source": metadata.get("source_url"),
-                        "content": postprocess_markdown(chunk_content.strip()),
-                        "metadata": metadata.copy(),
-                    })
+        for chunk_content in content.split('\n\n'):
+            chunk_content = chunk_content.strip()
+            if chunk_content:
+                chunks.append({
+                    "source": metadata.get("source_url"),
+                    "content": postprocess_markdown(chunk_content),
+                    "metadata": metadata,
+                })
+    _assign_chunk_ids(chunks)
+    return chunks
 
-    if nlp:
-        for chunk in chunks:
-            chunk["metadata"]["tags"] = extract_tags_spacy(chunk["content"])
+def chunk_documents(documents: List[Dict]) -> List[List[Dict]]:
+    """
+    Chunk several documents at once, returning one chunk list per document.
+    spaCy tagging runs as a single nlp.pipe pass over every chunk; TF-IDF stays
+    fitted per document so tags match chunk_document.
+    """
+    chunk_lists = [_split_document(document) for document in documents]
+    all_chunks = [chunk for chunks in chunk_lists for chunk in chunks]
+    if _get_nlp():
+        all_tags = extract_tags_spacy_batch([chunk["content"] for chunk in all_chunks])
     elif TfidfVectorizer:
-        texts = [chunk["content"] for chunk in chunks]
-        tags_list = extract_tags_tfidf(texts)
-        for chunk, tags in zip(chunks, tags_list):
-            chunk["metadata"]["tags"] = tags
+        all_tags = [tags for chunks in chunk_lists for tags in extract_tags_tfidf([chunk["content"] for chunk in chunks])]
     else:
-        for chunk in chunks:
-            chunk["metadata"]["tags"] = []
-    return chunks
+        all_tags = [[] for _ in all_chunks]
+    # Chunks share their document's metadata until here; each gets its own dict along with its tags
+    for chunk, tags in zip(all_chunks, all_tags):
+        chunk["metadata"] = {**chunk["metadata"], "tags": tags}
+    return chunk_lists
+
+def chunk_document(document: Dict) -> List[Dict]:
+    return chunk_documents([document])[0]
 
 def extract_title_from_content(content: str, metadata: dict = None) -> str:
     # 1. Prefer metadata title if available and non-generic
     if metadata:
-        meta_title = metadata.get("title")
-        if meta_title and meta_title.strip().lower() not in ["no title found", "untitled", "", None]:
-            return meta_title.strip()[:120]
+        meta_title = (metadata.get("title") or "").strip()
+        if meta_title and meta_title.lower() not in ["no title found", "untitled"]:
+            return meta_title[:120]
     # 2. Prefer first Markdown heading
     lines = content.strip().split('\n')
     for line in lines:
-        if re.match(r'^\s*#{1,6}\s+.+', line):
-            return re.sub(r'^#{1,6}\s+', '', line).strip()
+        if _MD_HEADING_LINE_RE.match(line):
+            return _MD_HEADING_MARK_RE.sub('', line).strip()
     # 3. Fallback: first non-empty line
     for line in lines:
-        if line.strip():
-            return line.strip()[:80]  # limit length
+        stripped = line.strip()
+        if stripped:
+            return stripped[:80]  # limit length
     return "Untitled"
 
 def format_chunks_for_ingestion(chunks: List[Dict], user_id: str = "default_user") -> List[Dict]:
@@ -415,6 +479,16 @@ def generate_ingestion_payload(document: Dict, team_id: str = "aline123", user_i
         "items": items
     }
 
+def generate_ingestion_payloads(documents: List[Dict], team_id: str = "aline123", user_id: str = "default_user") -> Dict:
+    """Like generate_ingestion_payload, but chunks a group of documents sharing team_id/user_id in one pass."""
+    items = []
+    for chunks in chunk_documents(documents):
+        items.extend(format_chunks_for_ingestion(chunks, user_id=user_id))
+    return {
+        "team_id": team_id,
+        "items": items
+    }
+
 def format_markdown(text: str) -> str:
     # Replace literal \n strings with actual newlines
     text = text.replace('\\n', '\n')
@@ -423,14 +497,11 @@ def format_markdown(text: str) -> str:
     text = text.replace('\r\n', '\n').replace('\r', '\n')
 
     # Ensure code blocks are surrounded by blank lines
-    text = re.sub(r'(?<!\n)```', r'\n```', text)
-    text = re.sub(r'```(?!\n)', r'```\n', text)
-
-    # Add spacing between headings and content
-    text = re.sub(r'(#+ .+)\n(?!\n)', r'\1\n\n', text)
+    text = _FENCE_BEFORE_RE.sub(r'\n```', text)
+    text = _FENCE_AFTER_RE.sub(r'```\n', text)
 
-    # Add spacing between paragraphs
-    text = re.sub(r'(?<!\n)\n(?=\S)', '\n\n', text)
+    # Add spacing between headings and content, and between paragraphs (one pass)
+    text = _PARAGRAPH_GAP_RE.sub(r'\1\n', text)
 
     return text.strip()
 
@@ -1,11 +1,317 @@
-import requests
+import asyncio
+import gzip
+import hashlib
+import io
+import aiohttp
+from lxml import etree
 from bs4 import BeautifulSoup
+# Bloom filter for crawl dedup on large sites, fallback to an exact set
+try:
+    from pybloom_live import ScalableBloomFilter
+except ImportError:
+    ScalableBloomFilter = None
+# Hyperscan screens pages for the JS/API patterns in one vectorized pass; optional
+try:
+    import hyperscan
+except ImportError:
+    hyperscan = None
+# Try to load selectolax for fast link extraction, fallback to BeautifulSoup
+try:
+    from selectolax.lexbor import LexborHTMLParser as HTMLParser
+except ImportError:
+    HTMLParser = None
 import re
 import json
-from urllib.parse import urljoin, urlparse, parse_qs
-from typing import List, Dict, Set, Optional
-import time
+from urllib.parse import urljoin, urlparse, parse_qs, parse_qsl, urlencode, urlsplit, urlunsplit
+from typing import AsyncIterator, List, Dict, Set, Optional, Tuple
 import random
+import threading
+from collections import defaultdict
+from functools import lru_cache
+
+PAGE_TIMEOUT = aiohttp.ClientTimeout(total=15)
+PROBE_TIMEOUT = aiohttp.ClientTimeout(total=10)
+# Upper bound on in-flight discovery requests
+MAX_CONNECTIONS = 16
+# Response bodies are read up to this many bytes; sitemaps may legitimately be up to 50 MB
+MAX_BODY_BYTES = 2 * 1024 * 1024
+MAX_SITEMAP_BYTES = 50 * 1024 * 1024
+# Page fetches allowed in flight at once against a single host
+HOST_CONNECTIONS = 4
+# Transient failures are retried with exponential backoff (0.3s, 0.6s)
+RETRIES = 2
+RETRY_BACKOFF = 0.3
+RETRY_STATUSES = frozenset({429, 500, 502, 503, 504})
+
+# Patterns are compiled once at import; the methods below only call them
+_ONCLICK_URL_RE = re.compile(r'["\']([^"\']*\.html?[^"\']*)["\']')
+_SITEMAP_RE = re.compile(r'Sitemap:\s*(.+)', re.IGNORECASE)
+# _should_explore_link hints: API paths, and file downloads anywhere in the URL (.docx/.xlsx included)
+_API_HINT_RE = re.compile(r'/api/|/wp-json/')
+_DOWNLOAD_HINT_RE = re.compile(r'\.(?:pdf|zip|doc|xls)', re.IGNORECASE)
+# Markup and numbers (dates, counters, ids) are ignored when fingerprinting page content
+_TAG_OR_DIGITS_RE = re.compile(r'<[^>]+>|\d+')
+# Common JS framework navigation/fetch patterns, fused so the HTML is scanned once:
+# window.location.href = "...", router.push("..."), navigate("..."), history.pushState(_, _, "..."),
+# fetch("..."), axios.get("...") and $.ajax({... url: "..."})
+_JS_URL_RE = re.compile(
+    r'(?:window\.location\.href\s*=\s*|router\.push\(|navigate\(|history\.pushState\([^,]+,\s*[^,]+,\s*'
+    r'|fetch\(|axios\.get\(|\.ajax\([^)]*url:\s*)["\']([^"\']+)["\']',
+    re.IGNORECASE,
+)
+# Common API patterns in quoted strings: generic, WordPress, Ghost, GraphQL, REST and versioned APIs
+_API_PATH_RE = re.compile(
+    r'["\'](/(?:api/[^"\']+|wp-json/[^"\']+|ghost/api/[^"\']+|graphql[^"\']*|rest/[^"\']+|v\d+/[^"\']+))["\']',
+    re.IGNORECASE,
+)
+
+
+def _compile_prefilter():
+    if hyperscan is None:
+        return None
+    flags = hyperscan.HS_FLAG_CASELESS | hyperscan.HS_FLAG_UTF8 | hyperscan.HS_FLAG_UCP | hyperscan.HS_FLAG_SINGLEMATCH
+    try:
+        db = hyperscan.Database()
+        db.compile(
+            expressions=[_JS_URL_RE.pattern.encode(), _API_PATH_RE.pattern.encode()],
+            ids=[0, 1], elements=2, flags=[flags, flags],
+        )
+        return db
+    except Exception as e:
+        print(f"[DISCOVERY] Hyperscan unavailable, using re only: {e}")
+        return None
+
+# ids 0/1 are _JS_URL_RE/_API_PATH_RE. Scratch space is per thread since page scans run in worker threads.
+_HS_DB = _compile_prefilter()
+_hs_local = threading.local()
+
+
+def _prefilter(html_content: str):
+    """
+    Return the set of pattern ids (0 = JS, 1 = API) that occur in the page, or None
+    without Hyperscan. Only families that occur are then extracted with re.
+    """
+    if _HS_DB is None:
+        return None
+    scratch = getattr(_hs_local, 'scratch', None)
+    if scratch is None:
+        scratch = _hs_local.scratch = hyperscan.Scratch(_HS_DB)
+    hits = set()
+    _HS_DB.scan(html_content.encode('utf-8', 'ignore'), match_event_handler=lambda id_, *_: hits.add(id_), scratch=scratch)
+    return hits
+
+# Common pagination patterns, each with the template used to generate further pages.
+# /posts/N and /blog/N are recognised but have no template, so they never produce URLs.
+_PAGINATION_PATTERNS = tuple((re.compile(p), template) for p, template in [
+    (r'page=\d+', '{}page={}'),
+    (r'p=\d+', '{}p={}'),
+    (r'paged=\d+', '{}paged={}'),
+    (r'/page/\d+', '{}/page/{}'),
+    (r'/p/\d+', '{}/p/{}'),
+])
+# One scan rules out URLs that match none of the pagination patterns
+_PAGINATION_RE = re.compile('|'.join(pattern.pattern for pattern, _ in _PAGINATION_PATTERNS))
+# Common non-content URLs, as a single alternation so each URL is scanned once
+_SKIP_RE = re.compile(
+    r'\.(?:css|js|png|jpg|jpeg|gif|svg|ico|pdf|zip|tar|gz)$'
+    r'|#|mailto:|tel:|javascript:|/admin/|/login|/logout|/wp-admin/',
+    re.IGNORECASE,
+)
+
+
+def _iter_link_targets(html_content: str):
+    """Yield raw link targets from a[href], [data-href] and URLs quoted in onclick handlers."""
+    if HTMLParser is not None:
+        # One CSS query over lexbor's C DOM instead of three BeautifulSoup traversals
+        for node in HTMLParser(html_content).css('a[href], [data-href], [onclick]'):
+            attrs = node.attributes
+            # Valueless attributes come back as None; BeautifulSoup reports them as ''
+            if node.tag == 'a' and 'href' in attrs:
+                yield attrs['href'] or ''
+            if 'data-href' in attrs:
+                yield attrs['data-href'] or ''
+            if 'onclick' in attrs:
+                yield from _ONCLICK_URL_RE.findall(attrs['onclick'] or '')
+        return
+    # Fallback: one walk over every tag, checking all three attributes on each
+    for element in BeautifulSoup(html_content, "lxml").find_all(True):
+        attrs = element.attrs
+        if not attrs:
+            continue
+        # Standard anchor tags
+        if element.name == 'a' and 'href' in attrs:
+            yield attrs['href']
+        # Look for links in data attributes (common in JS frameworks)
+        if 'data-href' in attrs:
+            yield attrs['data-href']
+        # Look for links in onclick handlers
+        if 'onclick' in attrs:
+            yield from _ONCLICK_URL_RE.findall(attrs['onclick'])
+
+
+def _scan_sitemap(content: bytes):
+    """
+    Stream a sitemap or sitemap index, returning (locs, child_sitemaps).
+    Every <loc> is returned, in any namespace; those directly inside a <sitemap>
+    entry are also returned as child sitemaps. Finished entries are cleared as the
+    parse goes, so memory stays flat however large the file is.
+    """
+    if content[:2] == b'\x1f\x8b':  # .xml.gz served without Content-Encoding
+        content = gzip.decompress(content)
+    locs = []
+    child_sitemaps = []
+    for _, elem in etree.iterparse(io.BytesIO(content), events=('end',), recover=True):
+        tag = elem.tag
+        if not isinstance(tag, str):  # comments and processing instructions
+            continue
+        name = etree.QName(tag).localname
+        if name == 'loc':
+            url = elem.text or ''
+            locs.append(url)
+            parent = elem.getparent()
+            if parent is not None and etree.QName(parent).localname == 'sitemap':
+                child_sitemaps.append(url)
+        elif name in ('url', 'sitemap'):
+            elem.clear()
+            # Drop the entries already handled so the root does not keep them alive
+            while elem.getprevious() is not None:
+                del elem.getparent()[0]
+    return locs, child_sitemaps
+
+
+# The same hrefs and URLs recur on every page of a site; both helpers are pure, so memoize them
+_join = lru_cache(maxsize=200_000)(urljoin)
+
+
+@lru_cache(maxsize=100_000)
+def _is_valid_url(url: str, base_domain: str) -> bool:
+    """Check if URL is valid and should be explored."""
+    if not url or '#' in url:
+        return False
+    
+    # Cheap prefix test first: anchors, mailto:, tel:, javascript:, data: and relative
+    # hrefs are the bulk of rejects. Leading whitespace is left to urlsplit, which strips it.
+    if url[0] > ' ' and not url[:8].lower().startswith(('http://', 'https://')):
+        return False
+    
+    try:
+        parsed = urlsplit(url)
+        if parsed.scheme not in ('http', 'https'):
+            return False
+        
+        # Only explore same domain
+        if parsed.netloc.lower() != base_domain:
+            return False
+        
+        # Skip common non-content URLs
+        return not _SKIP_RE.search(url)
+    except Exception:
+        return False
+
+
+def _is_markup(content_type: str) -> bool:
+    # An absent Content-Type is given the benefit of the doubt
+    return not content_type or 'html' in content_type or 'xml' in content_type
+
+
+async def _read_capped(response: aiohttp.ClientResponse, max_bytes: int) -> bytes:
+    """Read at most max_bytes of the (already decompressed) body."""
+    chunks = []
+    remaining = max_bytes
+    while remaining > 0:
+        chunk = await response.content.read(remaining)
+        if not chunk:
+            break
+        chunks.append(chunk)
+        remaining -= len(chunk)
+    return b''.join(chunks)
+
+
+def _decode(response: aiohttp.ClientResponse, body: bytes) -> str:
+    # Trust the declared charset instead of running charset detection over the body
+    try:
+        return body.decode(response.charset or 'utf-8', 'replace')
+    except LookupError:
+        return body.decode('utf-8', 'replace')
+
+
+def _canonical_url(url: str) -> str:
+    """Dedup key: lowercase scheme/host, no fragment or trailing slash, sorted query parameters."""
+    parts = urlsplit(url)
+    query = urlencode(sorted(parse_qsl(parts.query, keep_blank_values=True)))
+    return urlunsplit((parts.scheme.lower(), parts.netloc.lower(), parts.path.rstrip('/') or '/', query, ''))
+
+
+def _content_digest(html_content: str) -> bytes:
+    """Fingerprint of a page's text, so mirrored pages that differ only in markup or numbers match."""
+    stripped = _TAG_OR_DIGITS_RE.sub('', html_content)
+    return hashlib.blake2b(stripped.encode('utf-8', 'ignore'), digest_size=16).digest()
+
+
+class _SeenKeys:
+    """
+    Crawl dedup set. With pybloom_live installed this is a scalable Bloom filter
+    (a few bytes per entry instead of the whole key); a false positive, at ~1e-4,
+    only skips one page.
+    """
+    
+    def __init__(self):
+        if ScalableBloomFilter is not None:
+            self._seen = ScalableBloomFilter(initial_capacity=100_000, error_rate=1e-4)
+        else:
+            self._seen = set()
+    
+    def _key(self, item):
+        return item
+    
+    def __contains__(self, item) -> bool:
+        return self._key(item) in self._seen
+    
+    def add(self, item) -> bool:
+        """Mark item as seen; returns True if it was not seen before."""
+        key = self._key(item)
+        if key in self._seen:
+            return False
+        self._seen.add(key)
+        return True
+
+
+class _SeenURLs(_SeenKeys):
+    """URLs already queued for a crawl, compared by canonical form."""
+    
+    def _key(self, url: str) -> str:
+        return _canonical_url(url)
+
+
+def _scan_feed(content: bytes) -> List[str]:
+    """
+    Stream an RSS or Atom feed and return each entry's link: the text of an RSS
+    <item>'s first <link>, or the href of an Atom <entry>'s first <link>.
+    """
+    urls = []
+    for _, elem in etree.iterparse(io.BytesIO(content), events=('end',), recover=True):
+        tag = elem.tag
+        if not isinstance(tag, str):
+            continue
+        name = etree.QName(tag).localname
+        if name not in ('item', 'entry'):
+            continue
+        link = next(elem.iter('{*}link'), None)
+        if link is not None:
+            if name == 'item':
+                urls.append(''.join(link.itertext()))
+            elif link.get('href'):
+                urls.append(link.get('href'))
+        elem.clear()
+        while elem.getprevious() is not None:
+            del elem.getparent()[0]
+    return urls
+
+
+def _open_session(max_connections: int = MAX_CONNECTIONS) -> aiohttp.ClientSession:
+    # Keep-alive pool: same-host probes reuse TCP/TLS connections; DNS answers are cached
+    connector = aiohttp.TCPConnector(limit=max_connections, keepalive_timeout=30, ttl_dns_cache=300)
+    return aiohttp.ClientSession(connector=connector)
 
 class ContentDiscovery:
     """
@@ -14,157 +320,279 @@ class ContentDiscovery:
     tied to specific websites.
     """
     
-    def __init__(self, base_url: str, max_depth: int = 3, delay: float = 1.0):
+    def __init__(self, base_url: str, max_depth: int = 3, delay: float = 1.0, max_connections: int = MAX_CONNECTIONS):
         self.base_url = base_url
         self.max_depth = max_depth
         self.delay = delay
-        self.visited = set()
+        self.max_connections = max_connections
+        # Host names are case-insensitive
+        self._base_domain = urlparse(base_url).netloc.lower()
+        self._session = None
+        self._owned_session = None
+        self._semaphore = None
+        self._host_semaphores = None
+        # netloc -> event-loop time at which the next page fetch to that host may start
+        self._host_next_start = {}
+        # Pages queued for exploration; membership is by canonical URL
+        self.visited = _SeenURLs()
+        # Fingerprints of pages already parsed; duplicates are not parsed again
+        self._content_seen = _SeenKeys()
         self.discovered_urls = set()
         self.api_endpoints = set()
+        self._pagination_urls = set()
+        self._category_urls = set()
+        # (category, url) pairs waiting to be yielded by iter_discovered
+        self._discovered = None
         self.headers = {
             'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
         }
     
-    def discover_all_content(self) -> Dict[str, Set[str]]:
+    async def discover_all_content(self, html_content: Optional[str] = None, session: Optional[aiohttp.ClientSession] = None) -> Dict[str, Set[str]]:
         """
         Main discovery method that finds all types of content.
         Returns a dictionary with different types of discovered URLs.
+        Takes the same arguments as iter_discovered.
+        """
+        async for _ in self.iter_discovered(html_content, session):
+            pass
+        return self._results()
+    
+    async def iter_discovered(self, html_content: Optional[str] = None,
+                              session: Optional[aiohttp.ClientSession] = None) -> AsyncIterator[Tuple[str, str]]:
         """
+        Run discovery and yield (category, url) as soon as each new URL is found, with the
+        categories of discover_all_content. Each pair is yielded once per instance.
+        If html_content is given it is used for the base URL instead of downloading it again.
+        Pass an existing session to reuse its connection pool. Otherwise the session opened by
+        ``async with ContentDiscovery(...)`` is used, or a temporary one for this run.
+        At most max_connections requests are in flight at once.
+        """
+        session = session or self._owned_session
+        if session is None:
+            async with _open_session(self.max_connections) as session:
+                async for item in self.iter_discovered(html_content, session):
+                    yield item
+            return
+        self._session = session
+        self._semaphore = asyncio.Semaphore(self.max_connections)
+        self._host_semaphores = defaultdict(lambda: asyncio.Semaphore(HOST_CONNECTIONS))
+        self._discovered = asyncio.Queue()
+        
+        # Discovery runs in the background; a None marks the end of its results
+        task = asyncio.ensure_future(self._run(html_content))
+        task.add_done_callback(lambda _: self._discovered.put_nowait(None))
+        try:
+            while True:
+                item = await self._discovered.get()
+                if item is None:
+                    break
+                yield item
+            await task
+        finally:
+            # The caller may stop iterating early
+            if not task.done():
+                task.cancel()
+                await asyncio.gather(task, return_exceptions=True)
+            self._discovered = None
+    
+    async def _run(self, html_content: Optional[str] = None):
         print(f"[DISCOVERY] Starting content discovery for {self.base_url}")
         
         # Start with the base URL
-        self._discover_from_page(self.base_url, depth=0)
-        
-        # Look for common patterns and API endpoints
-        self._find_api_endpoints()
-        self._find_sitemaps()
-        self._find_rss_feeds()
+        await self._crawl(html_content)
         
+        # Look for common patterns and API endpoints; the probes are independent, so run them together
+        await asyncio.gather(
+            self._find_api_endpoints(),
+            self._find_sitemaps(),
+            self._find_rss_feeds(),
+        )
+    
+    def _results(self) -> Dict[str, Set[str]]:
+        """Everything found so far, by category."""
         return {
             'content_urls': self.discovered_urls,
             'api_endpoints': self.api_endpoints,
-            'pagination_urls': self._find_pagination_patterns(),
-            'category_urls': self._find_category_patterns()
+            'pagination_urls': self._pagination_urls,
+            'category_urls': self._category_urls,
         }
     
-    def _discover_from_page(self, url: str, depth: int):
-        """Recursively discover content from a page."""
-        if depth > self.max_depth or url in self.visited:
+    def _record(self, category: str, urls):
+        """Keep the URLs of a category not seen before and pass them on to iter_discovered."""
+        found = self._results()[category]
+        new = [url for url in dict.fromkeys(urls) if url not in found]
+        if not new:
+            return
+        found.update(new)
+        if self._discovered is not None:
+            for url in new:
+                self._discovered.put_nowait((category, url))
+        if category == 'content_urls':
+            # Pagination and category pages are derived from content URLs as they arrive
+            self._record('pagination_urls', self._find_pagination_patterns(new))
+            self._record('category_urls', self._find_category_patterns(new))
+    
+    async def __aenter__(self):
+        self._owned_session = _open_session(self.max_connections)
+        return self
+    
+    async def __aexit__(self, *exc_info):
+        await self.close()
+    
+    async def close(self):
+        """Close the session opened by ``async with``, if any."""
+        if self._owned_session is not None:
+            await self._owned_session.close()
+            self._owned_session = None
+    
+    async def _get(self, url: str, timeout: aiohttp.ClientTimeout, pause: bool = False, binary: bool = False,
+                   max_bytes: int = MAX_BODY_BYTES, markup_only: bool = False):
+        """
+        GET url under the shared concurrency limit, retrying connection errors, timeouts
+        and RETRY_STATUSES responses. Returns (response, body); body is bytes if binary
+        else the decoded text, and holds at most max_bytes of the response. With
+        markup_only, non-HTML/XML responses are not read and body is None. With pause,
+        the request is paced per host (see _wait_for_host) and takes a per-host slot.
+        """
+        if pause:
+            netloc = urlparse(url).netloc
+            await self._wait_for_host(netloc)
+            async with self._host_semaphores[netloc]:
+                return await self._get(url, timeout, binary=binary, max_bytes=max_bytes, markup_only=markup_only)
+        for attempt in range(RETRIES + 1):
+            if attempt:
+                await asyncio.sleep(RETRY_BACKOFF * 2 ** (attempt - 1))
+            try:
+                async with self._semaphore:
+                    async with self._session.get(url, headers=self.headers, timeout=timeout) as response:
+                        if response.status in RETRY_STATUSES and attempt < RETRIES:
+                            continue
+                        if markup_only and not _is_markup(response.content_type):
+                            return response, None
+                        body = await _read_capped(response, max_bytes)
+                return response, (body if binary else _decode(response, body))
+            except (aiohttp.ClientConnectionError, asyncio.TimeoutError):
+                if attempt == RETRIES:
+                    raise
+    
+    async def _wait_for_host(self, netloc: str):
+        """
+        Be respectful: page fetches to one host start at least delay (plus jitter) apart.
+        Each caller reserves its start time before sleeping, so waiters queue up exactly
+        and fetches to other hosts are never held back.
+        """
+        now = asyncio.get_running_loop().time()
+        start = max(now, self._host_next_start.get(netloc, now))
+        self._host_next_start[netloc] = start + self.delay + random.uniform(0, 0.5)
+        if start > now:
+            await asyncio.sleep(start - now)
+    
+    async def _crawl(self, html_content: Optional[str] = None):
+        """
+        Breadth-first crawl from base_url with max_connections worker tasks sharing one queue.
+        URLs are deduplicated when enqueued, so each page is queued at most once.
+        """
+        queue = asyncio.Queue()
+        self.visited.add(self.base_url)
+        queue.put_nowait((self.base_url, 0, html_content))
+        
+        async def handle(url, depth, html):
+            await self._discover_from_page(url, depth, queue, html)
+        
+        await self._drain(queue, handle)
+    
+    async def _drain(self, queue: asyncio.Queue, handle, producer=None):
+        """
+        Call handle(*item) for queued items with max_connections worker tasks until the
+        queue is empty. Handlers may queue more items. If a producer coroutine is given,
+        the workers start on its items while it is still running.
+        """
+        async def worker():
+            while True:
+                item = await queue.get()
+                try:
+                    await handle(*item)
+                finally:
+                    queue.task_done()
+        
+        workers = [asyncio.create_task(worker()) for _ in range(self.max_connections)]
+        try:
+            if producer is not None:
+                await producer
+            await queue.join()
+        finally:
+            for task in workers:
+                task.cancel()
+            await asyncio.gather(*workers, return_exceptions=True)
+    
+    async def _discover_from_page(self, url: str, depth: int, queue: asyncio.Queue, html_content: Optional[str] = None):
+        """Discover content from a page and queue its unseen links for the next depth."""
+        if depth > self.max_depth:
             return
         
-        self.visited.add(url)
         print(f"[DISCOVERY] Exploring {url} (depth {depth})")
         
         try:
-            response = requests.get(url, headers=self.headers, timeout=15)
-            response.raise_for_status()
-            html_content = response.text
-            
-            # Find all links on the page
-            soup = BeautifulSoup(html_content, "html.parser")
-            
-            # Extract links
-            links = self._extract_links(soup, url)
-            
-            # Look for JavaScript patterns that might indicate dynamic content
-            js_patterns = self._find_js_content_patterns(html_content)
+            if html_content is None:
+                response, html_content = await self._get(url, PAGE_TIMEOUT, pause=True, markup_only=True)
+                response.raise_for_status()
+                if html_content is None:
+                    print(f"[DISCOVERY] Skipping {url}: not an HTML page ({response.content_type})")
+                    return
             
-            # Look for API calls in JavaScript
-            api_calls = self._find_api_calls_in_js(html_content)
+            # Hashing and parsing are CPU-bound; keep them off the event loop so other fetches progress
+            digest = await asyncio.to_thread(_content_digest, html_content)
+            if not self._content_seen.add(digest):
+                print(f"[DISCOVERY] Skipping {url}: same content as a page already explored")
+                return
+            links, api_calls = await asyncio.to_thread(self._scan_page, html_content, url)
             
             # Add discovered URLs
-            self.discovered_urls.update(links)
-            self.api_endpoints.update(api_calls)
+            self._record('content_urls', links)
+            self._record('api_endpoints', api_calls)
             
-            # Add delay to be respectful
-            time.sleep(self.delay + random.uniform(0, 0.5))
-            
-            # Recursively explore if within depth limit
+            # Explore further if within depth limit
             if depth < self.max_depth:
                 for link in links:
-                    if self._should_explore_link(link):
-                        self._discover_from_page(link, depth + 1)
+                    if self._should_explore_link(link) and self.visited.add(link):
+                        queue.put_nowait((link, depth + 1, None))
                         
         except Exception as e:
             print(f"[DISCOVERY] Error exploring {url}: {e}")
     
-    def _extract_links(self, soup: BeautifulSoup, base_url: str) -> Set[str]:
-        """Extract all links from a page."""
-        links = set()
+    def _scan_page(self, html_content: str, url: str):
+        """Return (links, api_calls) found in a page."""
+        # Find all links on the page
+        links = self._extract_links(html_content, url)
         
-        # Standard anchor tags
-        for a in soup.find_all('a', href=True):
-            href = a['href']
-            abs_url = urljoin(base_url, href)
-            if self._is_valid_url(abs_url):
-                links.add(abs_url)
-        
-        # Look for links in data attributes (common in JS frameworks)
-        for element in soup.find_all(attrs={'data-href': True}):
-            href = element.get('data-href')
-            abs_url = urljoin(base_url, href)
-            if self._is_valid_url(abs_url):
-                links.add(abs_url)
+        # Pages that contain neither pattern family (the common case) skip the re scans
+        hits = _prefilter(html_content)
         
-        # Look for links in onclick handlers
-        for element in soup.find_all(attrs={'onclick': True}):
-            onclick = element.get('onclick', '')
-            urls = re.findall(r'["\']([^"\']*\.html?[^"\']*)["\']', onclick)
-            for url in urls:
-                abs_url = urljoin(base_url, url)
-                if self._is_valid_url(abs_url):
-                    links.add(abs_url)
+        # Look for JavaScript patterns that might indicate dynamic content
+        js_patterns = self._find_js_content_patterns(html_content) if hits is None or 0 in hits else set()
         
-        return links
+        # Look for API calls in JavaScript
+        api_calls = self._find_api_calls_in_js(html_content) if hits is None or 1 in hits else set()
+        return links, api_calls
+    
+    def _extract_links(self, html_content: str, base_url: str) -> Set[str]:
+        """Extract all links from a page."""
+        return self._valid_urls(base_url, _iter_link_targets(html_content))
     
     def _find_js_content_patterns(self, html_content: str) -> Set[str]:
         """Find patterns that indicate JavaScript-loaded content."""
-        patterns = set()
-        
-        # Look for common JS framework patterns
-        js_patterns = [
-            r'window\.location\.href\s*=\s*["\']([^"\']+)["\']',
-            r'router\.push\(["\']([^"\']+)["\']',
-            r'navigate\(["\']([^"\']+)["\']',
-            r'history\.pushState\([^,]+,\s*[^,]+,\s*["\']([^"\']+)["\']',
-            r'fetch\(["\']([^"\']+)["\']',
-            r'axios\.get\(["\']([^"\']+)["\']',
-            r'\.ajax\([^)]*url:\s*["\']([^"\']+)["\']',
-        ]
-        
-        for pattern in js_patterns:
-            matches = re.findall(pattern, html_content, re.IGNORECASE)
-            for match in matches:
-                abs_url = urljoin(self.base_url, match)
-                if self._is_valid_url(abs_url):
-                    patterns.add(abs_url)
-        
-        return patterns
+        return self._valid_urls(self.base_url, _JS_URL_RE.findall(html_content))
     
     def _find_api_calls_in_js(self, html_content: str) -> Set[str]:
         """Find API endpoints called from JavaScript."""
-        api_endpoints = set()
-        
-        # Common API patterns
-        api_patterns = [
-            r'["\'](/api/[^"\']+)["\']',
-            r'["\'](/wp-json/[^"\']+)["\']',  # WordPress
-            r'["\'](/ghost/api/[^"\']+)["\']',  # Ghost
-            r'["\'](/graphql[^"\']*)["\']',  # GraphQL
-            r'["\'](/rest/[^"\']+)["\']',  # REST APIs
-            r'["\'](/v\d+/[^"\']+)["\']',  # Versioned APIs
-        ]
-        
-        for pattern in api_patterns:
-            matches = re.findall(pattern, html_content, re.IGNORECASE)
-            for match in matches:
-                abs_url = urljoin(self.base_url, match)
-                if self._is_valid_url(abs_url):
-                    api_endpoints.add(abs_url)
-        
-        return api_endpoints
+        return self._valid_urls(self.base_url, _API_PATH_RE.findall(html_content))
+    
+    def _valid_urls(self, base_url: str, hrefs) -> Set[str]:
+        """Resolve hrefs against base_url and keep the valid ones."""
+        base_domain = self._base_domain
+        return {url for url in (_join(base_url, href) for href in hrefs) if _is_valid_url(url, base_domain)}
     
-    def _find_api_endpoints(self):
+    async def _find_api_endpoints(self):
         """Try to discover API endpoints by checking common paths."""
         common_api_paths = [
             '/api',
@@ -179,17 +607,20 @@ class ContentDiscovery:
             '/v2',
         ]
         
-        for path in common_api_paths:
+        async def probe(path):
             try:
                 url = urljoin(self.base_url, path)
-                response = requests.get(url, headers=self.headers, timeout=10)
-                if response.status_code == 200:
-                    self.api_endpoints.add(url)
+                # Only the status matters here, so the body is not read
+                response, _ = await self._get(url, PROBE_TIMEOUT, max_bytes=0)
+                if response.status == 200:
+                    self._record('api_endpoints', [url])
                     print(f"[DISCOVERY] Found API endpoint: {url}")
-            except:
-                continue
+            except Exception:
+                pass
+        
+        await asyncio.gather(*[probe(path) for path in common_api_paths])
     
-    def _find_sitemaps(self):
+    async def _find_sitemaps(self):
         """Find and parse sitemaps."""
         sitemap_paths = [
             '/sitemap.xml',
@@ -199,42 +630,55 @@ class ContentDiscovery:
             '/robots.txt'
         ]
         
-        for path in sitemap_paths:
+        # Sitemaps found by the probes and the children of sitemap indexes share one queue,
+        # so nested sitemaps are fetched concurrently; each URL is queued once, which also
+        # stops indexes that list each other from looping
+        queue = asyncio.Queue()
+        queued = _SeenURLs()
+        
+        def enqueue(url, content=None):
+            if queued.add(url):
+                queue.put_nowait((url, content))
+        
+        async def probe(path):
             try:
                 url = urljoin(self.base_url, path)
-                response = requests.get(url, headers=self.headers, timeout=10)
-                if response.status_code == 200:
+                response, content = await self._get(url, PROBE_TIMEOUT, binary=True, max_bytes=MAX_SITEMAP_BYTES)
+                if response.status == 200:
                     if path == '/robots.txt':
                         # Extract sitemap URLs from robots.txt
-                        sitemap_urls = re.findall(r'Sitemap:\s*(.+)', response.text, re.IGNORECASE)
-                        for sitemap_url in sitemap_urls:
-                            self._parse_sitemap(sitemap_url.strip())
+                        for sitemap_url in _SITEMAP_RE.findall(_decode(response, content)):
+                            enqueue(sitemap_url.strip())
                     else:
-                        self._parse_sitemap(url)
-            except:
-                continue
+                        # Already downloaded; parse it without fetching it again
+                        enqueue(url, content)
+            except Exception:
+                pass
+        
+        async def handle(url, content):
+            for child in await self._parse_sitemap(url, content):
+                enqueue(child)
+        
+        await self._drain(queue, handle, asyncio.gather(*[probe(path) for path in sitemap_paths]))
     
-    def _parse_sitemap(self, sitemap_url: str):
-        """Parse a sitemap XML file."""
+    async def _parse_sitemap(self, sitemap_url: str, content: Optional[bytes] = None) -> List[str]:
+        """Parse a sitemap XML file, downloading it unless content is given. Returns the child sitemap URLs."""
         try:
-            response = requests.get(sitemap_url, headers=self.headers, timeout=10)
-            soup = BeautifulSoup(response.content, 'xml')
+            if content is None:
+                response, content = await self._get(sitemap_url, PROBE_TIMEOUT, binary=True, max_bytes=MAX_SITEMAP_BYTES)
+            locs, child_sitemaps = await asyncio.to_thread(_scan_sitemap, content)
             
             # Find all URLs in sitemap
-            for loc in soup.find_all('loc'):
-                url = loc.get_text()
-                if self._is_valid_url(url):
-                    self.discovered_urls.add(url)
+            self._record('content_urls', [url for url in locs if self._is_valid_url(url)])
             
             # Look for sitemap index files
-            for sitemap in soup.find_all('sitemap'):
-                sitemap_url = sitemap.find('loc').get_text()
-                self._parse_sitemap(sitemap_url)
+            return child_sitemaps
                 
         except Exception as e:
             print(f"[DISCOVERY] Error parsing sitemap {sitemap_url}: {e}")
+            return []
     
-    def _find_rss_feeds(self):
+    async def _find_rss_feeds(self):
         """Find RSS/Atom feeds."""
         feed_paths = [
             '/feed',
@@ -246,75 +690,44 @@ class ContentDiscovery:
             '/blog/rss'
         ]
         
-        for path in feed_paths:
+        async def probe(path):
             try:
                 url = urljoin(self.base_url, path)
-                response = requests.get(url, headers=self.headers, timeout=10)
-                if response.status_code == 200:
-                    self._parse_feed(url, response.text)
-            except:
-                continue
+                response, content = await self._get(url, PROBE_TIMEOUT, binary=True)
+                if response.status == 200:
+                    self._parse_feed(url, content)
+            except Exception:
+                pass
+        
+        await asyncio.gather(*[probe(path) for path in feed_paths])
     
-    def _parse_feed(self, feed_url: str, content: str):
-        """Parse RSS/Atom feeds."""
+    def _parse_feed(self, feed_url: str, content):
+        """Parse RSS/Atom feeds; content is the raw body (bytes keep the declared encoding intact)."""
         try:
-            soup = BeautifulSoup(content, 'xml')
-            
-            # RSS feeds
-            for item in soup.find_all('item'):
-                link = item.find('link')
-                if link:
-                    url = link.get_text()
-                    if self._is_valid_url(url):
-                        self.discovered_urls.add(url)
-            
-            # Atom feeds
-            for entry in soup.find_all('entry'):
-                link = entry.find('link')
-                if link and link.get('href'):
-                    url = link.get('href')
-                    if self._is_valid_url(url):
-                        self.discovered_urls.add(url)
+            if isinstance(content, str):
+                content = content.encode('utf-8')
+            self._record('content_urls', [url for url in _scan_feed(content) if self._is_valid_url(url)])
                         
         except Exception as e:
             print(f"[DISCOVERY] Error parsing feed {feed_url}: {e}")
     
-    def _find_pagination_patterns(self) -> Set[str]:
-        """Find pagination URLs from discovered URLs."""
-        pagination_urls = set()
-        
-        # Common pagination patterns
-        pagination_patterns = [
-            r'page=\d+',
-            r'p=\d+',
-            r'paged=\d+',
-            r'/page/\d+',
-            r'/p/\d+',
-            r'/posts/\d+',
-            r'/blog/\d+',
-        ]
-        
-        for url in self.discovered_urls:
-            for pattern in pagination_patterns:
-                if re.search(pattern, url):
-                    # Generate more pages
-                    base_url = re.sub(pattern, '', url)
-                    for page in range(1, 11):  # Try first 10 pages
-                        if 'page=' in pattern:
-                            pagination_urls.add(f"{base_url}page={page}")
-                        elif 'p=' in pattern:
-                            pagination_urls.add(f"{base_url}p={page}")
-                        elif 'paged=' in pattern:
-                            pagination_urls.add(f"{base_url}paged={page}")
-                        elif '/page/' in pattern:
-                            pagination_urls.add(f"{base_url}/page/{page}")
-                        elif '/p/' in pattern:
-                            pagination_urls.add(f"{base_url}/p/{page}")
+    def _find_pagination_patterns(self, urls=None) -> Set[str]:
+        """Find pagination URLs from urls (default: all discovered URLs)."""
+        # Many URLs share a paginated stem (page=2, page=3, ...); collect each stem once
+        stems = set()
+        for url in self.discovered_urls if urls is None else urls:
+            if not _PAGINATION_RE.search(url):
+                continue
+            for pattern, template in _PAGINATION_PATTERNS:
+                base_url, found = pattern.subn('', url)
+                if found:
+                    stems.add((template, base_url))
         
-        return pagination_urls
+        # Generate more pages: try the first 10 for every stem
+        return {template.format(base_url, page) for template, base_url in stems for page in range(1, 11)}
     
-    def _find_category_patterns(self) -> Set[str]:
-        """Find category/tag URLs from discovered URLs."""
+    def _find_category_patterns(self, urls=None) -> Set[str]:
+        """Find category/tag URLs from urls (default: all discovered URLs)."""
         category_urls = set()
         
         # Common category patterns
@@ -327,7 +740,7 @@ class ContentDiscovery:
             r'/blog/tag/',
         ]
         
-        for url in self.discovered_urls:
+        for url in self.discovered_urls if urls is None else urls:
             for pattern in category_patterns:
                 if pattern in url:
                     category_urls.add(url)
@@ -339,73 +752,48 @@ class ContentDiscovery:
     
     def _is_valid_url(self, url: str) -> bool:
         """Check if URL is valid and should be explored."""
-        if not url:
-            return False
-        
-        try:
-            parsed = urlparse(url)
-            if parsed.scheme not in ('http', 'https'):
-                return False
-            
-            # Only explore same domain
-            base_domain = urlparse(self.base_url).netloc
-            if parsed.netloc != base_domain:
-                return False
-            
-            # Skip common non-content URLs
-            skip_patterns = [
-                r'\.(css|js|png|jpg|jpeg|gif|svg|ico|pdf|zip|tar|gz)$',
-                r'#',
-                r'mailto:',
-                r'tel:',
-                r'javascript:',
-                r'/admin/',
-                r'/login',
-                r'/logout',
-                r'/wp-admin/',
-            ]
-            
-            for pattern in skip_patterns:
-                if re.search(pattern, url, re.IGNORECASE):
-                    return False
-            
-            return True
-        except:
-            return False
+        # The cache is keyed on the base domain too, so crawls of different sites can share it
+        return _is_valid_url(url, self._base_domain)
     
     def _should_explore_link(self, url: str) -> bool:
         """Determine if a link should be explored further."""
-        # Skip if already visited
-        if url in self.visited:
-            return False
-        
         # Skip if it's likely an API endpoint
-        if '/api/' in url or '/wp-json/' in url:
+        if _API_HINT_RE.search(url):
             return False
         
         # Skip if it's a file download
-        if any(ext in url.lower() for ext in ['.pdf', '.zip', '.doc', '.xls']):
+        if _DOWNLOAD_HINT_RE.search(url):
             return False
         
-        return True
+        # Skip if already visited; checked last since it canonicalizes the URL
+        return url not in self.visited
 
 
-def discover_content_from_url(base_url: str, max_depth: int = 3) -> Dict[str, Set[str]]:
+async def discover_content_from_url_async(base_url: str, max_depth: int = 3, html_content: Optional[str] = None,
+                                         session: Optional[aiohttp.ClientSession] = None) -> Dict[str, Set[str]]:
     """
     Convenience function to discover content from a URL.
     
     Args:
         base_url: The starting URL for discovery
         max_depth: Maximum depth to crawl
+        html_content: Already-fetched HTML for base_url, if the caller has it
+        session: aiohttp session to reuse; a private one is opened if omitted
     
     Returns:
         Dictionary containing discovered URLs by type
     """
     discovery = ContentDiscovery(base_url, max_depth=max_depth)
-    return discovery.discover_all_content()
+    return await discovery.discover_all_content(html_content, session)
+
+
+def discover_content_from_url(base_url: str, max_depth: int = 3, html_content: Optional[str] = None) -> Dict[str, Set[str]]:
+    """Blocking wrapper around discover_content_from_url_async for callers without an event loop."""
+    return asyncio.run(discover_content_from_url_async(base_url, max_depth, html_content))
 
 
-def enhance_crawl_with_discovery(start_url: str, depth: int, visited: set = None) -> List[tuple]:
+async def enhance_crawl_with_discovery(start_url: str, depth: int, visited: set = None,
+                                       session: Optional[aiohttp.ClientSession] = None) -> List[tuple]:
     """
     Enhanced crawling function that combines your existing crawl logic
     with the new discovery capabilities.
@@ -413,29 +801,42 @@ def enhance_crawl_with_discovery(start_url: str, depth: int, visited: set = None
     This function can be used as a drop-in replacement for your existing
     crawl_urls function to get more comprehensive results.
     """
+    if session is None:
+        async with _open_session() as session:
+            return await enhance_crawl_with_discovery(start_url, depth, visited, session)
     if visited is None:
         visited = set()
     
     # Use the discovery system to find additional URLs
-    discovery_results = discover_content_from_url(start_url, max_depth=depth)
+    discovery = ContentDiscovery(start_url, max_depth=depth)
     
-    # Combine all discovered URLs
-    all_urls = set()
-    all_urls.update(discovery_results['content_urls'])
-    all_urls.update(discovery_results['pagination_urls'])
-    all_urls.update(discovery_results['category_urls'])
+    # Convert to the format your existing system expects.
+    # Refetches go through the discovery's own limiter, headers and retries.
+    async def fetch(url):
+        try:
+            response, html = await discovery._get(url, PAGE_TIMEOUT, markup_only=True)
+            response.raise_for_status()
+            if html is None:
+                print(f"[ENHANCED_CRAWL] Skipping {url}: not an HTML page ({response.content_type})")
+            return url, html
+        except Exception as e:
+            print(f"[ENHANCED_CRAWL] Failed to fetch {url}: {e}")
+            return url, None
     
-    # Convert to the format your existing system expects
+    # Content, pagination and category URLs overlap; fetch each canonical URL once,
+    # starting as soon as discovery yields it
+    seen = _SeenURLs()
+    for url in visited:
+        seen.add(url)
+    fetches = []
+    async for category, url in discovery.iter_discovered(session=session):
+        if category == 'api_endpoints' or url in visited or not seen.add(url):
+            continue
+        fetches.append(asyncio.ensure_future(fetch(url)))
+    pages = await asyncio.gather(*fetches)
     results = []
-    for url in all_urls:
-        if url not in visited:
-            try:
-                response = requests.get(url, timeout=15)
-                response.raise_for_status()
-                html = response.text
-                results.append((url, html, set()))  # Empty set for found_urls to maintain compatibility
-                visited.add(url)
-            except Exception as e:
-                print(f"[ENHANCED_CRAWL] Failed to fetch {url}: {e}")
-    
+    for url, html in pages:
+        if html is not None:
+            results.append((url, html, set()))  # Empty set for found_urls to maintain compatibility
+            visited.add(url)
     return results 
\ No newline at end of file
@@ -1,21 +1,43 @@
 import requests
-from bs4 import BeautifulSoup
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+import concurrent.futures
+import hashlib
+import tempfile
+import threading
+from functools import lru_cache
+from urllib.parse import urlparse
+from bs4 import BeautifulSoup, Tag
+# Try to load selectolax for fast HTML parsing, fallback to BeautifulSoup
+try:
+    from selectolax.lexbor import LexborHTMLParser
+except ImportError:
+    LexborHTMLParser = None
 from markdownify import markdownify as md
-import pdfplumber
-from typing import Dict, Any, List
+from typing import Dict, Any, List, Tuple, Union
 import trafilatura
 import lxml.etree as ET
 from dateutil import parser as dateparser
-import json
+import io
+import logging
+import mmap
+import orjson
 import os
 import re
 from .chunker import auto_wrap_code_blocks, smart_join_pdf_lines, postprocess_markdown
+from .utils import KeywordMatcher
 try:
-    import fitz  # PyMuPDF
+    import numpy as np
 except ImportError:
-    fitz = None
-import openai
-from prompts import get_author
+    np = None
+try:
+    import diskcache
+except ImportError:
+    diskcache = None
+from prompts import get_author, _openai_client
+
+# OpenAI author lookups log prompts and responses at DEBUG, so they cost nothing unless enabled
+logger = logging.getLogger(__name__)
 
 # Import prompts configuration
 try:
@@ -36,157 +58,299 @@ except ImportError:
         }
         return configs.get(mode, configs["balanced"])
 
-def extract_opengraph_and_jsonld(soup: BeautifulSoup) -> Dict:
-    meta = {}
-    # OpenGraph
-    for tag in soup.find_all('meta'):
-        if tag.get('property', '').startswith('og:'):
-            key = tag['property'][3:]
-            meta[key] = tag.get('content')
-        if tag.get('name', '').startswith('article:'):
-            key = tag['name'][8:]
-            meta[key] = tag.get('content')
-        if tag.get('name', '').lower() == 'author':
-            meta['author'] = tag.get('content')
-    # JSON-LD
-    for script in soup.find_all('script', type='application/ld+json'):
+# One pooled session for every page fetched here, so connections to a host are reused
+FETCH_WORKERS = 50
+# (connect, read) seconds. Failures are not retried, so one slow host cannot stretch a batch
+FETCH_TIMEOUT = (3.0, 10.0)
+# Concurrent fetches allowed per host, so a slow host cannot take over the pool
+HOST_FETCHES = 2
+_SESSION = requests.Session()
+_SESSION.headers['User-Agent'] = 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
+_ADAPTER = HTTPAdapter(pool_connections=FETCH_WORKERS, pool_maxsize=FETCH_WORKERS, max_retries=Retry(total=0))
+_SESSION.mount('http://', _ADAPTER)
+_SESSION.mount('https://', _ADAPTER)
+_HOST_SLOTS = {}
+_HOST_SLOTS_LOCK = threading.Lock()
+
+def _host_slot(url: str) -> threading.Semaphore:
+    host = urlparse(url).netloc.lower()
+    with _HOST_SLOTS_LOCK:
+        slot = _HOST_SLOTS.get(host)
+        if slot is None:
+            slot = _HOST_SLOTS[host] = threading.Semaphore(HOST_FETCHES)
+        return slot
+
+def _fetch_html(url: str):
+    """GET url over the shared session; returns the page text, or None after logging the failure."""
+    try:
+        with _host_slot(url):
+            response = _SESSION.get(url, timeout=FETCH_TIMEOUT)
+        response.raise_for_status()
+        return response.text
+    except requests.RequestException as e:
+        print(f"Failed to fetch URL {url} with error: {e}")
+        return None
+
+# PDF text dumps under debug_output/ are off unless INGEST_DEBUG is set
+DEBUG_DUMP = os.getenv("INGEST_DEBUG", "").lower() in ("1", "true", "yes")
+# A single writer keeps the dumps in order without blocking the extraction that produced them
+_DEBUG_WRITER = concurrent.futures.ThreadPoolExecutor(max_workers=1) if DEBUG_DUMP else None
+
+def _write_debug_dumps(pdf_path: str, raw_extracted: str, raw_text: str):
+    debug_dir = "debug_output"
+    os.makedirs(debug_dir, exist_ok=True)
+    pdf_base = os.path.splitext(os.path.basename(pdf_path))[0]
+    with open(os.path.join(debug_dir, f"{pdf_base}_raw_extracted.txt"), "w", encoding="utf-8") as f:
+        f.write(raw_extracted)
+    with open(os.path.join(debug_dir, f"{pdf_base}_smart_joined.txt"), "w", encoding="utf-8") as f:
+        f.write(raw_text)
+
+def _dump_debug(pdf_path: str, raw_extracted: str, raw_text: str):
+    if _DEBUG_WRITER is not None:
+        _DEBUG_WRITER.submit(_write_debug_dumps, pdf_path, raw_extracted, raw_text)
+
+# Author heuristics run these on every candidate line; compile them once
+_BY_LINE_RE = re.compile(r'By ([A-Za-z ,.-]+)$', re.IGNORECASE)
+_AUTHOR_LINE_RE = re.compile(r'Author: ([A-Za-z ,.-]+)$', re.IGNORECASE)
+_WRITTEN_BY_RE = re.compile(r'Written by ([A-Za-z ,.-]+)$', re.IGNORECASE)
+_BY_NAME_RE = re.compile(r'\bby\s+([A-Z][a-z]+(?:\s+[A-Z][a-z]+)*)', re.IGNORECASE)
+_NAME_ROLE_RE = re.compile(r'^[A-Z][a-z]+ [A-Z][a-z]+( [A-Z][a-z]+)?[ \u00b7,\-]+')
+_ROLE_SPLIT_RE = re.compile(r'[·,\-]')
+_FULL_NAME_RE = re.compile(r'^[A-Z][a-z]+ [A-Z][a-z]+$')
+_NAME_LINE_RE = re.compile(r'^[A-Z][a-z]+(?:\s+[A-Z][a-z]+)*$')
+_UPPER_LINE_RE = re.compile(r'^[A-Z .\-]{4,}$')
+_MD_HEADING_RE = re.compile(r'^#{1,6} ', re.MULTILINE)
+# Job titles that mark a 'Firstname Lastname · Co-Founder at ...' byline
+_NAME_ROLE_KEYWORDS = KeywordMatcher(['co-founder', 'editor', 'ceo', 'cto', 'founder', 'chief', 'writer', 'author', 'lead', 'manager'])
+
+# PyMuPDF and pdfplumber each take ~100 ms to import, so they are loaded by the code that uses them
+@lru_cache(maxsize=1)
+def _fitz():
+    """The PyMuPDF module, or None when it is not installed."""
+    try:
+        import pymupdf as fitz
+    except ImportError:
+        try:
+            import fitz
+        except ImportError:
+            return None
+    return fitz
+
+# HTML trees are lexbor documents when selectolax is installed, BeautifulSoup otherwise;
+# these helpers hide the difference from the extractors below.
+# Text can still differ in whitespace: lexbor parses as HTML5, so it drops the newline right
+# after <pre> (which can move a code fence by a line) and keeps tab/space runs that html.parser's
+# tree puts elsewhere, e.g. around unclosed <DT>/<TD> cells.
+def _parse(html_content: str):
+    if LexborHTMLParser is not None:
+        return LexborHTMLParser(html_content)
+    return BeautifulSoup(html_content, "html.parser")
+
+def _css(tree, selector: str) -> list:
+    return tree.select(selector) if isinstance(tree, Tag) else tree.css(selector)
+
+def _css_first(tree, selector: str):
+    return tree.select_one(selector) if isinstance(tree, Tag) else tree.css_first(selector)
+
+def _attr(node, name: str):
+    return node.get(name) if isinstance(node, Tag) else node.attributes.get(name)
+
+def _attrs(node) -> dict:
+    # lexbor builds a new dict on every .attributes access; fetch it once per node
+    return node.attrs if isinstance(node, Tag) else node.attributes
+
+def _text(node, separator: str = '', strip: bool = False) -> str:
+    if isinstance(node, Tag):
+        return node.get_text(separator, strip=strip)
+    return node.text(separator=separator, strip=strip)
+
+def _tag_name(node) -> str:
+    return node.name if isinstance(node, Tag) else node.tag
+
+def _outer_html(node) -> str:
+    return str(node) if node is None or isinstance(node, Tag) else node.html
+
+def _visible_text(tree, separator: str = '') -> str:
+    """Text of the page without <script>/<style> contents; the tree itself is not modified."""
+    if isinstance(tree, Tag):
+        # BeautifulSoup's get_text already leaves out script and style strings
+        return tree.get_text(separator)
+    tree = tree.clone()
+    tree.strip_tags(['script', 'style'])
+    return tree.text(separator=separator)
+
+def _iter_visible_text(tree):
+    """Yield the page's text nodes in document order, skipping <script>/<style> contents."""
+    if isinstance(tree, Tag):
+        yield from tree.strings
+        return
+    for node in tree.root.traverse(include_text=True):
+        if node.is_text_node and node.parent.tag not in ('script', 'style'):
+            yield node.text_content
+
+def _first_lines(tree, count: int) -> List[str]:
+    """
+    The first count lines of _visible_text(tree, separator='\n'), without building the
+    text of the whole page.
+    """
+    text = ''
+    for i, piece in enumerate(_iter_visible_text(tree)):
+        text += '\n' + piece if i else piece
+        # Once a line has started after the first count, those count lines are complete
+        lines = text.splitlines()
+        if len(lines) > count:
+            return lines[:count]
+    return text.splitlines()[:count]
+
+def _collect_jsonld(tree) -> List[Any]:
+    """Decoded JSON-LD scripts of the page, skipping any that are not valid JSON."""
+    objs = []
+    for script in _css(tree, 'script[type="application/ld+json"]'):
         try:
-            data = json.loads(script.string)
-            if isinstance(data, dict):
-                if 'author' in data and isinstance(data['author'], dict) and 'name' in data['author']:
-                    meta['author'] = data['author']['name']
-                meta.update(data)
-            elif isinstance(data, list):
-                for item in data:
-                    if isinstance(item, dict):
-                        if 'author' in item and isinstance(item['author'], dict) and 'name' in item['author']:
-                            meta['author'] = item['author']['name']
-                        meta.update(item)
-        except Exception:
+            objs.append(orjson.loads(_text(script)))
+        except orjson.JSONDecodeError:
             continue
+    return objs
+
+def extract_opengraph_and_jsonld(tree, jsonld=None) -> Dict:
+    """Pass jsonld (from _collect_jsonld) if the page's JSON-LD is already decoded."""
+    meta = {}
+    # OpenGraph; only metas with a property or name can match, and each is read in one pass
+    metas = [(attrs.get('property') or '', attrs.get('name') or '', attrs.get('content'))
+             for attrs in map(_attrs, _css(tree, 'meta[property], meta[name]'))]
+    for prop, name, content in metas:
+        if prop.startswith('og:'):
+            meta[prop[3:]] = content
+        if name.startswith('article:'):
+            meta[name[8:]] = content
+        if name.lower() == 'author':
+            meta['author'] = content
+    # JSON-LD
+    for data in (_collect_jsonld(tree) if jsonld is None else jsonld):
+        if isinstance(data, dict):
+            _merge_jsonld(meta, data)
+        elif isinstance(data, list):
+            for item in data:
+                if isinstance(item, dict):
+                    _merge_jsonld(meta, item)
     return meta
 
-def extract_author(soup: BeautifulSoup, html_content: str) -> str:
+# JSON-LD fields copied into the page metadata; whole graphs are not merged in
+_JSONLD_META_KEYS = ('datePublished', 'date', 'keywords')
+
+def _merge_jsonld(meta: Dict, obj: Dict):
+    for key in _JSONLD_META_KEYS:
+        if key in obj:
+            meta[key] = obj[key]
+    if 'author' in obj:
+        author = obj['author']
+        meta['author'] = author['name'] if isinstance(author, dict) and 'name' in author else author
+
+def _find_author_in_jsonld(objs: List[Any]) -> str:
+    """
+    First Person name or author field in the decoded JSON-LD, walked depth-first in
+    document order. @graph entries are searched before the author of the object holding them.
+    """
+    # An explicit stack instead of recursion; (obj, True) marks a dict whose @graph is already queued
+    stack = [(obj, False) for obj in reversed(objs)]
+    while stack:
+        obj, graph_queued = stack.pop()
+        if isinstance(obj, list):
+            stack.extend((item, False) for item in reversed(obj))
+            continue
+        if not isinstance(obj, dict):
+            continue
+        graph = obj.get('@graph')
+        if not graph_queued and isinstance(graph, list):
+            stack.append((obj, True))
+            stack.extend((item, False) for item in reversed(graph))
+            continue
+        name = obj.get('name')
+        if obj.get('@type') == 'Person' and isinstance(name, str):
+            return name.strip()
+        author = obj.get('author')
+        if isinstance(author, dict) and isinstance(author.get('name'), str):
+            return author['name'].strip()
+        if isinstance(author, list):
+            names = [a['name'] for a in author if isinstance(a, dict) and isinstance(a.get('name'), str)]
+            if names:
+                return ', '.join(names)
+        if isinstance(author, str) and author.strip():
+            return author.strip()
+    return ''
+
+def extract_author(tree, html_content: str, jsonld=None) -> str:
     # 1. Meta tags
     meta_author = (
-        soup.find('meta', attrs={'name': 'author'}) or
-        soup.find('meta', attrs={'property': 'article:author'}) or
-        soup.find('meta', attrs={'property': 'og:author'}) or
-        soup.find('meta', attrs={'name': 'twitter:creator'})
+        _css_first(tree, 'meta[name="author"]') or
+        _css_first(tree, 'meta[property="article:author"]') or
+        _css_first(tree, 'meta[property="og:author"]') or
+        _css_first(tree, 'meta[name="twitter:creator"]')
     )
-    if meta_author and meta_author.get('content'):
-        return meta_author['content'].strip()
+    if meta_author and _attr(meta_author, 'content'):
+        return _attr(meta_author, 'content').strip()
 
     # 2. JSON-LD - Enhanced to handle @graph structures
-    for script in soup.find_all('script', type='application/ld+json'):
-        try:
-            data = json.loads(script.string)
-            
-            # Handle @graph structure (common in WordPress)
-            if isinstance(data, dict) and '@graph' in data:
-                graph_data = data['@graph']
-                if isinstance(graph_data, list):
-                    for item in graph_data:
-                        if isinstance(item, dict):
-                            # Look for Person objects
-                            if item.get('@type') == 'Person' and 'name' in item:
-                                return item['name'].strip()
-                            # Look for author field in any object
-                            if 'author' in item:
-                                author = item['author']
-                                if isinstance(author, dict) and 'name' in author:
-                                    return author['name'].strip()
-                                elif isinstance(author, str):
-                                    return author.strip()
-            
-            # Handle direct author field
-            if isinstance(data, dict) and 'author' in data:
-                author = data['author']
-                if isinstance(author, dict) and 'name' in author:
-                    return author['name'].strip()
-                elif isinstance(author, list):
-                    names = [a['name'] for a in author if isinstance(a, dict) and 'name' in a]
-                    if names:
-                        return ', '.join(names)
-                elif isinstance(author, str):
-                    return author.strip()
-                    
-            # Handle list of objects
-            elif isinstance(data, list):
-                for item in data:
-                    if isinstance(item, dict):
-                        if item.get('@type') == 'Person' and 'name' in item:
-                            return item['name'].strip()
-                        if 'author' in item:
-                            author = item['author']
-                            if isinstance(author, dict) and 'name' in author:
-                                return author['name'].strip()
-                            elif isinstance(author, str):
-                                return author.strip()
-        except Exception:
-            continue
+    author = _find_author_in_jsonld(_collect_jsonld(tree) if jsonld is None else jsonld)
+    if author:
+        return author
 
     # 3. Visible byline
     for selector in ['.author', '.byline', '.post-author', '.entry-author', '[itemprop=author]']:
-        el = soup.select_one(selector)
-        if el and el.get_text(strip=True):
-            return el.get_text(strip=True)
+        el = _css_first(tree, selector)
+        if el and _text(el, strip=True):
+            return _text(el, strip=True)
 
     # 4. Fallback: scan for 'By ...' in the first 30 lines of visible text
-    visible_text = soup.get_text(separator='\n')
-    lines = visible_text.splitlines()
+    lines = _first_lines(tree, 30)
     for line in lines[:30]:
-        m = re.match(r'By ([A-Za-z ,.-]+)$', line.strip(), re.IGNORECASE)
+        # Cheap prefix test first; most lines do not start with "by "
+        l = line.strip()
+        if l[:3].lower() != 'by ':
+            continue
+        m = _BY_LINE_RE.match(l)
         if m:
             return m.group(1).strip()
 
     # 5. Heuristic: scan first 30 lines for a name with a role (e.g., 'Firstname Lastname · Co-Founder at ...')
-    name_role_keywords = ['co-founder', 'editor', 'ceo', 'cto', 'founder', 'chief', 'writer', 'author', 'lead', 'manager']
     for line in lines[:30]:
         l = line.strip()
-        if re.match(r'^[A-Z][a-z]+ [A-Z][a-z]+( [A-Z][a-z]+)?[ \u00b7,\-]+', l):
-            lower = l.lower()
-            if any(kw in lower for kw in name_role_keywords):
-                name_part = re.split(r'[·,\-]', l)[0].strip()
-                return name_part
+        # The keyword scan is cheaper than the regex, so it goes first
+        if _NAME_ROLE_KEYWORDS.search(l.lower()) and _NAME_ROLE_RE.match(l):
+            name_part = _ROLE_SPLIT_RE.split(l)[0].strip()
+            return name_part
 
     # 6. New: Look for a standalone name near the top (first 10 lines) before or after the title
     # e.g., 'Nil Mamano' as a single line
-    name_pattern = re.compile(r'^[A-Z][a-z]+ [A-Z][a-z]+$')
     for i, line in enumerate(lines[:10]):
         l = line.strip()
-        if name_pattern.match(l):
+        # A match is exactly two words starting with A-Z
+        if l.count(' ') == 1 and 'A' <= l[:1] <= 'Z' and _FULL_NAME_RE.match(l):
             return l
     return ''
 
-def extract_from_url(url: str, html_content: str = None, author_mode: str = "balanced") -> Dict[str, Any]:
+def extract_from_url(url: str, html_content: str = None, author_mode: str = "balanced", resolve_author: bool = True) -> Dict[str, Any]:
     """
     Extracts the main content and metadata from a URL using a hybrid approach.
     Enhanced: Uses raw text as primary source to preserve code blocks, with trafilatura as fallback.
     Now uses auto_wrap_code_blocks for automatic code detection and wrapping.
     Author extraction uses content context, just like for PDFs.
+    With resolve_author=False only the rule-based pass runs, leaving the LLM fallback to the caller.
     """
-    headers = {
-        'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
-    }
-    
     if html_content is None:
-        try:
-            response = requests.get(url, headers=headers, timeout=15)
-            response.raise_for_status()
-            html_content = response.text
-        except requests.RequestException as e:
-            print(f"Failed to fetch URL {url} with error: {e}")
+        html_content = _fetch_html(url)
+        if html_content is None:
             return None
 
-    # Extract raw data first
-    raw_data = extract_raw_from_url(url, html_content)
+    # Parse once; the raw pass and the metadata pass share the tree
+    tree = _parse(html_content)
 
-    soup_orig = BeautifulSoup(html_content, "html.parser")
-    title = soup_orig.find("title").get_text() if soup_orig.find("title") else "No Title Found"
+    # Extract raw data first
+    raw_data = extract_raw_from_url(url, html_content, tree=tree)
+    title = raw_data['metadata']['title']
 
     # Enhanced metadata extraction
-    meta = extract_opengraph_and_jsonld(soup_orig)
+    meta = extract_opengraph_and_jsonld(tree)
     date = meta.get('datePublished') or meta.get('date')
     tags = meta.get('keywords')
     if isinstance(tags, str):
@@ -198,14 +362,18 @@ def extract_from_url(url: str, html_content: str = None, author_mode: str = "bal
     if raw_data and raw_data.get('raw_text'):
         raw_text = raw_data['raw_text']
         raw_text = raw_text.replace('\\n', '\n')
-        raw_text = re.sub(r'\n{3,}', '\n\n', raw_text)
-        raw_text = re.sub(r' +', ' ', raw_text)
+        # Collapse 3+ newlines to 2 and runs of spaces to one; each str.replace pass is a
+        # C-level scan, and only long runs need more than a couple of passes
+        while '\n\n\n' in raw_text:
+            raw_text = raw_text.replace('\n\n\n', '\n\n')
+        while '  ' in raw_text:
+            raw_text = raw_text.replace('  ', ' ')
         markdown_content = auto_wrap_code_blocks(raw_text, mode='web')
         content_for_context = raw_text
     else:
         content_xml = trafilatura.extract(html_content, include_comments=False, output_format='xml')
         if not content_xml:
-            main_content_html = str(soup_orig.find("article") or soup_orig.find("main") or soup_orig.body)
+            main_content_html = _outer_html(_css_first(tree, "article") or _css_first(tree, "main") or tree.body)
         else:
             soup_trafilatura = BeautifulSoup(content_xml, "lxml-xml")
             main_content_html = str(soup_trafilatura.find('main'))
@@ -217,7 +385,7 @@ def extract_from_url(url: str, html_content: str = None, author_mode: str = "bal
                     tag.decompose()
             return soup.get_text()
         markdown_content = md(main_content_html, heading_style="ATX", strip=['a'], code_language='text')
-        heading_count = len(re.findall(r'^#{1,6} ', markdown_content, re.MULTILINE))
+        heading_count = len(_MD_HEADING_RE.findall(markdown_content))
         if heading_count <= 1:
             fallback_md = html_to_markdown_with_headings(main_content_html)
             markdown_content = fallback_md
@@ -227,7 +395,7 @@ def extract_from_url(url: str, html_content: str = None, author_mode: str = "bal
     prompt_config = get_prompt_config(author_mode)
     context_length = prompt_config.get('content_length', 500)
     content_preview = content_for_context[:context_length]
-    author = get_author(title, content_preview, mode=author_mode)
+    author = get_author(title, content_preview, mode=author_mode, use_llm=resolve_author)
 
     return {
         'title': title,
@@ -247,7 +415,18 @@ def extract_from_url(url: str, html_content: str = None, author_mode: str = "bal
         }
     }
 
-def extract_structured_from_pdf(pdf_path, team_id="aline123", user_id="", source_url=None, author_mode="balanced"):
+def extract_from_urls(urls, author_mode: str = "balanced", resolve_author: bool = True):
+    """
+    Fetch and extract many URLs on a pool of FETCH_WORKERS threads.
+    Yields (url, document) pairs as each one finishes; document is None if the fetch failed.
+    """
+    with concurrent.futures.ThreadPoolExecutor(max_workers=FETCH_WORKERS) as pool:
+        futures = {pool.submit(extract_from_url, url, author_mode=author_mode, resolve_author=resolve_author): url for url in urls}
+        for future in concurrent.futures.as_completed(futures):
+            yield futures[future], future.result()
+
+def extract_structured_from_pdf(pdf_path, team_id="aline123", user_id="", source_url=None, author_mode="balanced", resolve_author=True):
+    fitz = _fitz()
     if not fitz:
         raise ImportError("PyMuPDF (fitz) is not installed.")
     doc = fitz.open(pdf_path)
@@ -255,77 +434,84 @@ def extract_structured_from_pdf(pdf_path, team_id="aline123", user_id="", source
     current_item = None
     font_sizes = []
     author_guess = None
-    raw_text_lines = []
-    
-    # Enhanced author extraction using first 10 pages
-    first_10_pages_text = extract_first_10_pages_content(pdf_path)
+    # Raw text for smart joining, written line by line
+    raw_buf = io.StringIO()
+    # Pages 1-10 in the format extract_first_10_pages_content gives, for author extraction
+    first_pages_parts = []
     
-    # Use new unified author extraction with first 10 pages content
-    title = source_url.split('/')[-1].split('\\')[-1] if source_url else os.path.basename(pdf_path)
-    author_guess = get_author(title, first_10_pages_text, mode=author_mode)
-    method = f"rule_based+openai_{author_mode}" if author_guess else "fallback"
-    
-    for page in doc:
+    # get_text("dict") is the expensive call, so each page is decoded once; the
+    # non-empty spans are kept for the section pass that needs the font threshold
+    spans = []
+    for page_num, page in enumerate(doc, start=1):
+        # Plain get_text() output is each line's spans joined, one line per row
+        page_text = [] if page_num <= 10 else None
         for block in page.get_text("dict")["blocks"]:
             for line in block.get("lines", []):
+                if page_text is not None:
+                    page_text.append("".join(span["text"] for span in line.get("spans", [])))
                 for span in line.get("spans", []):
+                    text = span["text"].strip()
                     font_sizes.append(span["size"])
                     # Collect raw text for smart joining
-                    raw_text_lines.append(span["text"].strip())
-    font_sizes.sort(reverse=True)
-    title_font_threshold = font_sizes[max(1, len(font_sizes) // 10)] if font_sizes else 0
-    for page_num, page in enumerate(doc, start=1):
-        blocks = page.get_text("dict")["blocks"]
-        for block in blocks:
-            for line in block.get("lines", []):
-                for span in line.get("spans", []):
-                    text = span["text"].strip()
-                    font_size = span["size"]
-                    if not text:
-                        continue
-                    if font_size >= title_font_threshold:
-                        if current_item:
-                            items.append(current_item)
-                        current_item = {
-                            "title": text,
-                            "content": f"## {text}\n",
-                            "content_type": "book",
-                            "source_url": source_url or os.path.abspath(pdf_path),
-                            "page_number": page_num,
-                            "author": author_guess or "",
-                            "user_id": user_id
-                        }
-                    else:
-                        if current_item:
-                            current_item["content"] += text + "\n"
-                        else:
-                            current_item = {
-                                "title": "Untitled Section",
-                                "content": text + "\n",
-                                "content_type": "book",
-                                "source_url": source_url or os.path.abspath(pdf_path),
-                                "page_number": page_num,
-                                "author": author_guess or "",
-                                "user_id": user_id
-                            }
+                    raw_buf.write(text)
+                    raw_buf.write('\n')
+                    if text:
+                        spans.append((page_num, text, span["size"]))
+        if page_text:
+            page_text = "\n".join(page_text) + "\n"
+            if not page_text.isspace():
+                first_pages_parts.append(f"--- Page {page_num} ---\n{page_text}")
+    first_10_pages_text = "\n\n".join(first_pages_parts)
+    
+    # Use new unified author extraction with first 10 pages content
+    title = source_url.split('/')[-1].split('\\')[-1] if source_url else os.path.basename(pdf_path)
+    author_guess = get_author(title, first_10_pages_text, mode=author_mode, use_llm=resolve_author)
+    method = f"rule_based+openai_{author_mode}" if author_guess else "fallback"
+    if font_sizes:
+        # The max(1, N // 10)-th largest size (0-based); partition selects it in O(N) without sorting every span
+        k = len(font_sizes) - 1 - max(1, len(font_sizes) // 10)
+        if np is not None:
+            title_font_threshold = float(np.partition(np.asarray(font_sizes, dtype=np.float64), k)[k])
+        else:
+            title_font_threshold = sorted(font_sizes)[k]
+    else:
+        title_font_threshold = 0
+    # Section text is collected as a list of lines and joined once the section closes
+    content_parts = []
+    for page_num, text, font_size in spans:
+        if font_size >= title_font_threshold:
+            if current_item:
+                current_item["content"] = "\n".join(content_parts) + "\n"
+                items.append(current_item)
+            current_item = {
+                "title": text,
+                "content": "",
+                "content_type": "book",
+                "source_url": source_url or os.path.abspath(pdf_path),
+                "page_number": page_num,
+                "author": author_guess or "",
+                "user_id": user_id
+            }
+            content_parts = [f"## {text}"]
+        else:
+            if not current_item:
+                current_item = {
+                    "title": "Untitled Section",
+                    "content": "",
+                    "content_type": "book",
+                    "source_url": source_url or os.path.abspath(pdf_path),
+                    "page_number": page_num,
+                    "author": author_guess or "",
+                    "user_id": user_id
+                }
+            content_parts.append(text)
     if current_item:
+        current_item["content"] = "\n".join(content_parts) + "\n"
         items.append(current_item)
-    # Debug output directory
-    debug_dir = "debug_output"
-    if not os.path.exists(debug_dir):
-        os.makedirs(debug_dir)
-    pdf_base = os.path.splitext(os.path.basename(pdf_path))[0]
-    # Step 1: Raw extracted text
-    raw_extracted = '\n'.join(raw_text_lines)
-    with open(os.path.join(debug_dir, f"{pdf_base}_raw_extracted.txt"), "w", encoding="utf-8") as f:
-        f.write(raw_extracted)
-    # Step 2: Smart-joined text
+    # Raw extracted text (without the last line's newline, as a join would give), then smart-joined
+    raw_extracted = raw_buf.getvalue()[:-1]
     raw_text = smart_join_pdf_lines(raw_extracted)
-    with open(os.path.join(debug_dir, f"{pdf_base}_smart_joined.txt"), "w", encoding="utf-8") as f:
-        f.write(raw_text)
-    # Step 3: Final raw_text
-    with open(os.path.join(debug_dir, f"{pdf_base}_final_raw_text.txt"), "w", encoding="utf-8") as f:
-        f.write(raw_text)
+    _dump_debug(pdf_path, raw_extracted, raw_text)
     # Convert to markdown for output
     markdown_content = postprocess_markdown(raw_text, mode='pdf')
     output_items = [{
@@ -351,10 +537,11 @@ def extract_structured_from_pdf(pdf_path, team_id="aline123", user_id="", source
         "items": output_items,
         "raw_text": raw_text,
         "metadata": metadata,  # Include metadata with method
-        "method": method
+        "method": method,
+        "context": first_10_pages_text[:get_prompt_config(author_mode)["content_length"]]
     }
 
-def extract_from_pdf_plumber(file_path: str, source_url: str = None, author_mode: str = "balanced") -> Dict[str, Any]:
+def extract_from_pdf_plumber(file_path: str, source_url: str = None, author_mode: str = "balanced", resolve_author: bool = True) -> Dict[str, Any]:
     """
     Extracts text content from a local PDF file and returns it in a structured format for heading-based chunking.
     Title extraction: (1) PDF metadata Title if present and non-empty; (2) Largest text on first page; (3) Filename fallback.
@@ -362,8 +549,14 @@ def extract_from_pdf_plumber(file_path: str, source_url: str = None, author_mode
     Uses line-based extraction for better chunking and markdown.
     """
     lines: List[Dict] = []
-    raw_text_lines = []
+    raw_buf = io.StringIO()
+    # The content author heuristic below reads at most 20 lines plus the 3 after them
+    first_lines = []
+    # Pages 1-10 in the format extract_first_10_pages_content gives, used when fitz is missing
+    first_pages_parts = []
+    fitz = _fitz()
     try:
+        import pdfplumber
         with pdfplumber.open(file_path) as pdf:
             # 1. Try PDF metadata Title
             raw_title = pdf.metadata.get("Title") if pdf.metadata else None
@@ -390,23 +583,27 @@ def extract_from_pdf_plumber(file_path: str, source_url: str = None, author_mode
                 # Look for various author patterns
                 for line in first_page_text.splitlines():
                     line = line.strip()
+                    # Every pattern below needs "by" or "author:"; skip the regexes for other lines
+                    lower = line.lower()
+                    if 'by' not in lower and 'author:' not in lower:
+                        continue
                     # Pattern 1: "By John Doe"
-                    m = re.match(r'By ([A-Za-z ,.-]+)$', line, re.IGNORECASE)
+                    m = _BY_LINE_RE.match(line)
                     if m:
                         author = m.group(1).strip()
                         break
                     # Pattern 2: "Author: John Doe"
-                    m = re.match(r'Author: ([A-Za-z ,.-]+)$', line, re.IGNORECASE)
+                    m = _AUTHOR_LINE_RE.match(line)
                     if m:
                         author = m.group(1).strip()
                         break
                     # Pattern 3: "Written by John Doe"
-                    m = re.match(r'Written by ([A-Za-z ,.-]+)$', line, re.IGNORECASE)
+                    m = _WRITTEN_BY_RE.match(line)
                     if m:
                         author = m.group(1).strip()
                         break
                     # Pattern 4: Look for names after "by" in the middle of lines
-                    m = re.search(r'\bby\s+([A-Z][a-z]+(?:\s+[A-Z][a-z]+)*)', line, re.IGNORECASE)
+                    m = _BY_NAME_RE.search(line)
                     if m:
                         author = m.group(1).strip()
                         break
@@ -428,37 +625,39 @@ def extract_from_pdf_plumber(file_path: str, source_url: str = None, author_mode
                 text = page.extract_text()
                 if not text:
                     continue
-                for line in text.splitlines():
-                    line = line.strip()
+                if not fitz and page.page_number <= 10 and not text.isspace():
+                    first_pages_parts.append(f"--- Page {page.page_number} ---\n{text}")
+                # Strip and drop blank lines in one C-level pass, then write the page in one go
+                page_lines = [line for line in map(str.strip, text.splitlines()) if line]
+                if not page_lines:
+                    continue
+                raw_buf.write('\n'.join(page_lines))
+                raw_buf.write('\n')
+                first_lines.extend(page_lines[:23 - len(first_lines)])
+                # extract_text_lines reuses the text map extract_text just built and carries each
+                # line's own chars, so font size and y need no scan over the page's words
+                for text_line in page.extract_text_lines(return_chars=True):
+                    line = text_line["text"].strip()
                     if not line:
                         continue
-                    # Try to get font size info by matching words on the line
-                    words = page.extract_words(extra_attrs=["size", "top"])
-                    sizes = [w["size"] for w in words if w["text"].strip() in line and w.get("size")]
+                    sizes = [c["size"] for c in text_line["chars"] if c.get("size")]
                     avg_size = sum(sizes) / len(sizes) if sizes else 0
-                    # Use the y position of the first word in the line if available
-                    y = None
-                    for w in words:
-                        if w["text"].strip() in line and w.get("top"):
-                            y = round(w["top"], 1)
-                            break
-                    lines.append({"text": line, "size": avg_size, "y": y, "page": page.page_number})
-                    raw_text_lines.append(line)
+                    lines.append({"text": line, "size": avg_size, "y": round(text_line["top"], 1), "page": page.page_number})
             
             # If still no author, try to extract from the first few lines of content (after text extraction)
-            if not author and raw_text_lines:
+            if not author and first_lines:
                 # Look for author names in the first 20 lines
-                for i, line in enumerate(raw_text_lines[:20]):
+                for i, line in enumerate(first_lines[:20]):
                     line = line.strip()
                     # Pattern 1: Look for lines that look like author names (proper case, 2-4 words, or all uppercase)
-                    if (re.match(r'^[A-Z][a-z]+(?:\s+[A-Z][a-z]+)*$', line) or re.match(r'^[A-Z .\-]{4,}$', line)) and 2 <= len(line.split()) <= 4:
+                    if 2 <= len(line.split()) <= 4 and (_NAME_LINE_RE.match(line) or _UPPER_LINE_RE.match(line)):
                         # Avoid common words that might be mistaken for names
                         if line.lower() not in ['beyond cracking', 'coding interview', 'technical interview', 'careercup llc', 'palo alto ca']:
                             # Check if the next few lines also look like author names
                             author_candidates = [line]
-                            for j in range(i+1, min(i+4, len(raw_text_lines))):
-                                next_line = raw_text_lines[j].strip()
-                                if (re.match(r'^[A-Z][a-z]+(?:\s+[A-Z][a-z]+)*$', next_line) or re.match(r'^[A-Z .\-]{4,}$', next_line)) and 2 <= len(next_line.split()) <= 4:
+                            for j in range(i+1, min(i+4, len(first_lines))):
+                                next_line = first_lines[j].strip()
+                                if 2 <= len(next_line.split()) <= 4 and (_NAME_LINE_RE.match(next_line) or _UPPER_LINE_RE.match(next_line)):
                                     if next_line.lower() not in ['beyond cracking', 'coding interview', 'technical interview', 'careercup llc', 'palo alto ca']:
                                         author_candidates.append(next_line)
                             # If we found multiple author candidates, join them
@@ -467,30 +666,19 @@ def extract_from_pdf_plumber(file_path: str, source_url: str = None, author_mode
                             else:
                                 author = author_candidates[0]
                             break
-        # Debug output directory
-        debug_dir = "debug_output"
-        if not os.path.exists(debug_dir):
-            os.makedirs(debug_dir)
-        pdf_base = os.path.splitext(os.path.basename(file_path))[0]
-        # Step 1: Raw extracted text
-        raw_extracted = '\n'.join(raw_text_lines)
-        with open(os.path.join(debug_dir, f"{pdf_base}_raw_extracted.txt"), "w", encoding="utf-8") as f:
-            f.write(raw_extracted)
-        # Step 2: Smart-joined text
+        # Raw extracted text (without the last line's newline, as a join would give), then smart-joined
+        raw_extracted = raw_buf.getvalue()[:-1]
         raw_text = smart_join_pdf_lines(raw_extracted)
-        with open(os.path.join(debug_dir, f"{pdf_base}_smart_joined.txt"), "w", encoding="utf-8") as f:
-            f.write(raw_text)
-        # Step 3: Final raw_text
-        with open(os.path.join(debug_dir, f"{pdf_base}_final_raw_text.txt"), "w", encoding="utf-8") as f:
-            f.write(raw_text)
+        _dump_debug(file_path, raw_extracted, raw_text)
         # Convert to markdown for output
         markdown_content = postprocess_markdown(raw_text, mode='pdf')
         
-        # Get first 10 pages text for author extraction
-        first_10_pages_text = extract_first_10_pages_content(file_path)
+        # First 10 pages text for author extraction. Without fitz, extract_first_10_pages_content
+        # would reopen the PDF with pypdf, so the pdfplumber text gathered above is used instead
+        first_10_pages_text = extract_first_10_pages_content(file_path) if fitz else "\n\n".join(first_pages_parts)
         
         # Use new unified author extraction with first 10 pages content
-        author_guess = get_author(title, first_10_pages_text, mode=author_mode)
+        author_guess = get_author(title, first_10_pages_text, mode=author_mode, use_llm=resolve_author)
         method = f"rule_based+openai_{author_mode}" if author_guess else "fallback"
         
         # Update metadata to include the method and final author
@@ -510,30 +698,25 @@ def extract_from_pdf_plumber(file_path: str, source_url: str = None, author_mode
             "items": output_items,
             "metadata": metadata,
             "raw_text": raw_text,
-            "method": method
+            "method": method,
+            "context": first_10_pages_text[:get_prompt_config(author_mode)["content_length"]]
         }
     except Exception as e:
         print(f"Error reading PDF file: {e}")
         return None
 
-def extract_from_pdf(file_path: str, source_url: str = None, author_mode: str = "balanced") -> dict:
-    if fitz:
+def extract_from_pdf(file_path: str, source_url: str = None, author_mode: str = "balanced", resolve_author: bool = True) -> dict:
+    if _fitz():
         try:
-            return extract_structured_from_pdf(file_path, source_url=source_url, author_mode=author_mode)
+            return extract_structured_from_pdf(file_path, source_url=source_url, author_mode=author_mode, resolve_author=resolve_author)
         except Exception as e:
             print(f"[fitz] PDF extraction failed: {e}, falling back to pdfplumber.")
-    return extract_from_pdf_plumber(file_path, source_url=source_url, author_mode=author_mode)
+    return extract_from_pdf_plumber(file_path, source_url=source_url, author_mode=author_mode, resolve_author=resolve_author)
 
-def extract_raw_content(html_content: str) -> str:
-    """Extract raw content without any formatting or processing."""
-    soup = BeautifulSoup(html_content, "html.parser")
-    
-    # Remove script and style elements
-    for script in soup(["script", "style"]):
-        script.decompose()
-    
-    # Get all text content
-    raw_text = soup.get_text()
+def extract_raw_content(html_content: str, tree=None) -> str:
+    """Extract raw content without any formatting or processing. Pass tree if the page is already parsed."""
+    # Get all text content, leaving out script and style elements
+    raw_text = _visible_text(tree if tree is not None else _parse(html_content))
     
     # Clean up whitespace but preserve structure
     lines = raw_text.split('\n')
@@ -545,41 +728,37 @@ def extract_raw_content(html_content: str) -> str:
     
     return '\n'.join(cleaned_lines)
 
-def extract_raw_from_url(url: str, html_content: str = None) -> Dict[str, Any]:
+def extract_raw_from_url(url: str, html_content: str = None, tree=None) -> Dict[str, Any]:
     """
     Extracts raw content from a URL without any processing or formatting.
     Returns the raw HTML, raw text, and all code blocks found.
+    tree is html_content already parsed with _parse, if the caller has it.
     """
-    headers = {
-        'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
-    }
-    
     if html_content is None:
-        try:
-            response = requests.get(url, headers=headers, timeout=15)
-            response.raise_for_status()
-            html_content = response.text
-        except requests.RequestException as e:
-            print(f"Failed to fetch URL {url} with error: {e}")
+        html_content = _fetch_html(url)
+        if html_content is None:
             return None
 
+    if tree is None:
+        tree = _parse(html_content)
+
     # Extract raw text
-    raw_text = extract_raw_content(html_content)
+    raw_text = extract_raw_content(html_content, tree)
     
     # Extract all code blocks
-    soup = BeautifulSoup(html_content, "html.parser")
     code_blocks = []
-    for i, code in enumerate(soup.find_all(['code', 'pre'])):
-        code_text = code.get_text().strip()
+    for i, code in enumerate(_css(tree, 'code, pre')):
+        code_text = _text(code).strip()
         if code_text:
             code_blocks.append({
                 'index': i,
                 'content': code_text,
-                'element_type': code.name
+                'element_type': _tag_name(code)
             })
     
     # Extract basic metadata
-    title = soup.find("title").get_text() if soup.find("title") else "No Title Found"
+    title_node = _css_first(tree, "title")
+    title = _text(title_node) if title_node else "No Title Found"
     
     return {
         "raw_html": html_content,
@@ -596,18 +775,15 @@ def extract_raw_from_url(url: str, html_content: str = None) -> Dict[str, Any]:
 
 def get_author_via_openai(title_or_url, is_pdf=True, pdf_content=None, mode="balanced"):
     api_key = os.getenv('OPENAI_API_KEY')
-    print(f"[DEBUG] get_author_via_openai called with: {title_or_url}, mode: {mode}")
-    print(f"[DEBUG] OpenAI API key found: {'Yes' if api_key else 'No'}")
-    if api_key:
-        print(f"[DEBUG] OpenAI API key starts with: {api_key[:8]}...")
+    logger.debug("get_author_via_openai called with: %s, mode: %s", title_or_url, mode)
     
     if not api_key:
         print("[Author Extraction] OpenAI API key not found, using fallback method")
         return None, "fallback"
     
     try:
-        from openai import OpenAI
-        client = OpenAI(api_key=api_key)
+        # The shared client reads OPENAI_API_KEY itself and keeps its connections across calls
+        client = _openai_client()
         
         # Get prompt configuration for the mode
         config = get_prompt_config(mode)
@@ -623,15 +799,9 @@ def get_author_via_openai(title_or_url, is_pdf=True, pdf_content=None, mode="bal
         else:
             prompt = format_author_prompt(title_or_url, mode=mode)
         
-        print(f"[DEBUG] Using mode '{mode}' - content length: {content_length}, max tokens: {max_tokens}, model: {model}")
-        print(f"[DEBUG] About to call OpenAI API with prompt: {prompt[:100]}...")
+        logger.debug("Using mode '%s' - content length: %s, max tokens: %s, model: %s", mode, content_length, max_tokens, model)
         print(f"[Author Extraction] Using OpenAI API for: {title_or_url}")
-        
-        # Log the full prompt being sent
-        print(f"\n🔍 FULL PROMPT BEING SENT TO OPENAI:")
-        print("=" * 60)
-        print(prompt)
-        print("=" * 60)
+        logger.debug("Full prompt sent to OpenAI:\n%s", prompt)
         
         response = client.chat.completions.create(
             model=model,
@@ -641,59 +811,153 @@ def get_author_via_openai(title_or_url, is_pdf=True, pdf_content=None, mode="bal
         )
         
         author = response.choices[0].message.content.strip()
-        print(f"\n🤖 FULL OPENAI RESPONSE:")
-        print("=" * 60)
-        print(f"Response: '{author}'")
-        print(f"Model: {response.model}")
-        print(f"Usage: {response.usage}")
-        print("=" * 60)
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug("OpenAI response: '%s' (model: %s, usage: %s)", author, response.model, response.usage)
         
         if author.lower() == 'unknown' or not author:
-            print(f"[Author Extraction] OpenAI returned 'Unknown' or empty, using fallback")
+            print("[Author Extraction] OpenAI returned 'Unknown' or empty, using fallback")
             return None, "fallback"
         
         print(f"[Author Extraction] OpenAI found author: {author}")
         return author, f"openai_{mode}"
         
     except Exception as e:
-        print(f"[DEBUG] OpenAI API call failed with error: {e}")
         print(f"[Author Extraction] OpenAI API failed: {e}, using fallback")
         return None, "fallback"
 
+# With diskcache installed, first-pages text is kept per file content, so re-ingesting a PDF skips the parse
+PDF_TEXT_CACHE_DIR = os.getenv("PDF_TEXT_CACHE_DIR", os.path.join(tempfile.gettempdir(), "ingestai_pdf_cache"))
+PDF_TEXT_CACHE_SIZE = 500 * 1024 * 1024
+
+@lru_cache(maxsize=1)
+def _pdf_text_cache():
+    if diskcache is None or not PDF_TEXT_CACHE_DIR:
+        return None
+    return diskcache.Cache(PDF_TEXT_CACHE_DIR, size_limit=PDF_TEXT_CACHE_SIZE, eviction_policy="least-recently-used")
+
+def _file_digest(path) -> str:
+    # Hashing the mapped file in one update keeps OpenSSL in its SHA-NI loop and the file out of memory
+    with open(path, "rb") as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            return hashlib.sha256().hexdigest()
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+            return hashlib.sha256(mapped).hexdigest()
+
 def extract_first_10_pages_content(pdf_path):
     """
     Extract text content from the first 10 pages of a PDF file.
-    Returns the combined text from pages 1-10 (or all pages if less than 10).
+    Returns the combined text from pages 1-10 (or all pages if less than 10), or "" if the PDF cannot be read.
     """
     try:
-        if fitz:
-            # Use PyMuPDF (fitz)
-            doc = fitz.open(pdf_path)
-            pages_to_extract = min(10, doc.page_count)
-            content_parts = []
-            
-            for page_num in range(pages_to_extract):
-                page = doc[page_num]
-                page_text = page.get_text()
-                if page_text.strip():
-                    content_parts.append(f"--- Page {page_num + 1} ---\n{page_text}")
-            
-            doc.close()
-            return "\n\n".join(content_parts)
-        else:
-            # Fallback to pdfplumber
-            import pdfplumber
-            with pdfplumber.open(pdf_path) as pdf:
-                pages_to_extract = min(10, len(pdf.pages))
-                content_parts = []
-                
-                for page_num in range(pages_to_extract):
-                    page = pdf.pages[page_num]
-                    page_text = page.extract_text()
-                    if page_text and page_text.strip():
-                        content_parts.append(f"--- Page {page_num + 1} ---\n{page_text}")
-                
-                return "\n\n".join(content_parts)
+        return _first_10_pages_text(pdf_path)
     except Exception as e:
         print(f"Error extracting first 10 pages: {e}")
         return ""
+
+def _first_10_pages_text(pdf_path):
+    # extract_first_10_pages_content without the error handling, so batch workers can report failures
+    cache = _pdf_text_cache()
+    if cache is None:
+        return _read_first_10_pages(pdf_path)
+    # fitz and pypdf give different text, so the backend is part of the key
+    key = (_file_digest(pdf_path), "fitz" if _fitz() else "pypdf")
+    text = cache.get(key)
+    if text is None:
+        text = _read_first_10_pages(pdf_path)
+        if text:
+            cache.set(key, text)
+    return text
+
+def _iter_first_10_pages(pdf_path):
+    """Yield (page_number, text) for the non-blank pages among the first 10."""
+    fitz = _fitz()
+    if fitz:
+        # Use PyMuPDF (fitz). Plain "text" mode is as fast as "blocks" here, and flags
+        # such as TEXT_INHIBIT_SPACES drop word spacing the author prompt needs
+        with fitz.open(pdf_path) as doc:
+            for page_num, page in enumerate(doc.pages(0, min(10, doc.page_count)), start=1):
+                page_text = page.get_text()
+                if page_text and not page_text.isspace():
+                    yield page_num, page_text
+    else:
+        # Fallback to pypdf, which is much faster than pdfplumber's layout engine for plain prose
+        from pypdf import PdfReader
+        reader = PdfReader(pdf_path)
+        pages_to_extract = min(10, len(reader.pages))
+        
+        # pypdf only parses the pages it is asked for; one unreadable page is skipped, not fatal
+        for page_num in range(pages_to_extract):
+            try:
+                page_text = reader.pages[page_num].extract_text()
+            except Exception as e:
+                print(f"Error extracting page {page_num + 1}: {e}")
+                continue
+            if page_text and not page_text.isspace():
+                yield page_num + 1, page_text
+
+def _write_first_10_pages(pdf_path, out):
+    # Pages are separated by a blank line and written straight to out instead of joined afterwards
+    for i, (page_num, page_text) in enumerate(_iter_first_10_pages(pdf_path)):
+        if i:
+            out.write("\n\n")
+        out.write(f"--- Page {page_num} ---\n")
+        out.write(page_text)
+
+def _read_first_10_pages(pdf_path):
+    buf = io.StringIO()
+    _write_first_10_pages(pdf_path, buf)
+    return buf.getvalue()
+
+def _first_10_pages_to_file(pdf_path, out_path):
+    # extract_first_10_pages_to_file without the error handling, for batch workers
+    tmp_path = f"{out_path}.tmp"
+    try:
+        with open(tmp_path, "w", encoding="utf-8", newline="", buffering=1 << 20) as f:
+            if _pdf_text_cache() is None:
+                _write_first_10_pages(pdf_path, f)
+            else:
+                # Go through the cache so repeated runs skip parsing
+                f.write(_first_10_pages_text(pdf_path))
+        # Readers never see a half-written file
+        os.replace(tmp_path, out_path)
+    except BaseException:
+        try:
+            os.remove(tmp_path)
+        except OSError:
+            pass
+        raise
+    return out_path
+
+def extract_first_10_pages_to_file(pdf_path, out_path):
+    """
+    Write extract_first_10_pages_content's text to out_path page by page, so the
+    whole text is never held in memory. Returns out_path, or None if the PDF could not be read.
+    """
+    try:
+        return _first_10_pages_to_file(pdf_path, out_path)
+    except Exception as e:
+        print(f"Error extracting first 10 pages: {e}")
+        return None
+
+def extract_first_10_pages_batch(paths, workers=None, on_progress=None, out_paths=None) -> List[Tuple[str, Union[str, Exception]]]:
+    """
+    Run extract_first_10_pages_content over many PDFs in a process pool (parsing is CPU-bound).
+    Returns (path, text) pairs in input order, with the exception in place of the text for a
+    PDF that could not be read. on_progress(done, total) is called as each PDF finishes.
+    If out_paths is given, each PDF's text is written to the matching file instead and
+    that file's path is returned in place of the text.
+    """
+    results = {}
+    with concurrent.futures.ProcessPoolExecutor(max_workers=workers or os.cpu_count()) as pool:
+        if out_paths is None:
+            futures = {pool.submit(_first_10_pages_text, path): path for path in paths}
+        else:
+            futures = {pool.submit(_first_10_pages_to_file, path, out_path): path for path, out_path in zip(paths, out_paths)}
+        for done, future in enumerate(concurrent.futures.as_completed(futures), start=1):
+            try:
+                results[futures[future]] = future.result()
+            except Exception as e:
+                results[futures[future]] = e
+            if on_progress:
+                on_progress(done, len(futures))
+    return [(path, results[path]) for path in paths]
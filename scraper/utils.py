@@ -1,13 +1,72 @@
+from functools import lru_cache
+from types import MappingProxyType
+import orjson
+try:
+    import ahocorasick
+except ImportError:
+    ahocorasick = None
+
+class KeywordMatcher:
+    """
+    Finds any of a fixed set of phrases in a string.
+    Uses a pyahocorasick automaton (one linear pass) when installed,
+    otherwise falls back to plain substring checks.
+    """
+    def __init__(self, phrases):
+        self.phrases = tuple(phrases)
+        self._automaton = None
+        if ahocorasick is not None and self.phrases:
+            self._automaton = ahocorasick.Automaton()
+            for phrase in self.phrases:
+                self._automaton.add_word(phrase, phrase)
+            self._automaton.make_automaton()
+
+    def search(self, text):
+        """Return the first phrase found in text, or None."""
+        if self._automaton is not None:
+            for _, phrase in self._automaton.iter(text):
+                return phrase
+            return None
+        for phrase in self.phrases:
+            if phrase in text:
+                return phrase
+        return None
+
+@lru_cache(maxsize=256)
+def _item_template(content_type, source_url, author, user_id, title):
+    # Per-document defaults in output key order; content is filled in per chunk
+    return MappingProxyType({
+        "title": title or "Untitled",
+        "content": None,
+        "content_type": content_type,
+        "source_url": source_url,
+        "author": author or "",
+        "user_id": user_id or "",
+    })
+
+def _output_items(chunks, content_type, source_url, author, user_id, title):
+    template = _item_template(content_type, source_url, author, user_id, title)
+    return ({
+        **template,
+        "title": (meta := chunk.get("metadata") or {}).get("title") or template["title"],
+        "content": chunk["content"],
+        "author": meta.get("author") or template["author"],
+    } for chunk in chunks)
+
 def build_output(chunks, team_id, content_type, source_url, author=None, user_id=None, title=None):
-    items = []
-    for chunk in chunks:
-        meta = chunk.get("metadata", {})
-        items.append({
-            "title": meta.get("title") or title or "Untitled",
-            "content": chunk["content"],
-            "content_type": content_type,
-            "source_url": source_url,
-            "author": meta.get("author") or author or "",
-            "user_id": user_id or "",
-        })
+    items = list(_output_items(chunks, content_type, source_url, author, user_id, title))
     return {"team_id": team_id, "items": items}
+
+async def iter_items_json(head, items, tail=None):
+    """
+    Yield {**head, "items": [...], **tail()} as JSON bytes, one item at a time, so a
+    response body can be streamed without building the whole payload. tail is called
+    after the last item so it can report state gathered while streaming.
+    """
+    yield orjson.dumps(head)[:-1] + (b',"items":[' if head else b'"items":[')
+    separator = b""
+    async for item in items:
+        yield separator + orjson.dumps(item)
+        separator = b","
+    trailer = orjson.dumps(tail()) if tail else b"{}"
+    yield b"]" + (b"," + trailer[1:] if trailer != b"{}" else b"}")
@@ -8,15 +8,37 @@ setup(
     install_requires=[
         "click",
         "fastapi",
+        "pydantic>=2",
+        "anyio",
         "uvicorn[standard]",
         "requests",
-        "beautifulsoup4",
-        "pdfplumber",
+        "aiohttp",
+        "beautifulsoup4>=4.12",
+        "lxml>=5.1",
+        "pdfplumber>=0.10",
+        "pypdf>=4.3",
         "python-frontmatter",
         "markdownify",
-        "trafilatura",
+        "trafilatura>=1.12",
         "mistune",
+        "orjson>=3.10",
+        "charset-normalizer>=3.3",
     ],
+    # Optional accelerators; each is imported behind a fallback
+    extras_require={
+        "fast": [
+            "pymupdf>=1.24",
+            "selectolax",
+            "numpy",
+            "pyahocorasick",
+            "blake3",
+            "diskcache",
+            "pybloom-live",
+            "hyperscan",
+        ],
+    },
+    # The Docker image runs python:3.9
+    python_requires=">=3.9",
     entry_points={
         "console_scripts": [
             "ingestai=app:cli",